@@ -0,0 +1,193 @@
+# app/bulk.py
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from . import db
+from .errors import QueryError
+from .ledger import reconcile_rows
+from .pagination import primary_key
+from .summaries import CAPTURED_MODELS, apply_for_rows, capture_rows, captured_key, lock_for_rows
+from .versioning import stamp_rows
+
+DEFAULT_BULK_MAX_ITEMS = 10000
+DEFAULT_UPSERT_BATCH_SIZE = 1000
+
+
+class BulkError(QueryError):
+    pass
+
+
+def _missing_references(model, rows):
+    # One IN query per foreign key instead of one lookup per row
+    missing = {}
+    for column in model.__table__.columns:
+        for foreign_key in column.foreign_keys:
+            wanted = {row[column.name] for row in rows if row.get(column.name) is not None}
+            if not wanted:
+                continue
+            target = foreign_key.column
+            found = set(db.session.execute(select(target).where(target.in_(wanted))).scalars())
+            missing[column.name] = wanted - found
+    return missing
+
+
+def _validate_items(model, load_schema, items, key_columns=()):
+    if not isinstance(items, list):
+        raise BulkError('Request body must be a JSON array')
+    max_items = current_app.config.get('BULK_MAX_ITEMS', DEFAULT_BULK_MAX_ITEMS)
+    if len(items) > max_items:
+        raise BulkError(f'At most {max_items} items can be sent per request')
+
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            row = load_schema.load(item)
+        except ValidationError as e:
+            results[index] = {'index': index, 'status': 'error', 'errors': e.messages}
+            continue
+        missing_keys = [name for name in key_columns if row.get(name) is None]
+        if missing_keys:
+            results[index] = {'index': index, 'status': 'error',
+                              'errors': {name: ['Missing data for required field.'] for name in missing_keys}}
+        else:
+            valid.append((index, row))
+
+    missing = _missing_references(model, [row for _, row in valid])
+    rows = []
+    for index, row in valid:
+        errors = {name: ['Referenced row does not exist.'] for name, ids in missing.items() if row.get(name) in ids}
+        if errors:
+            results[index] = {'index': index, 'status': 'error', 'errors': errors}
+        else:
+            rows.append((index, row))
+    return results, rows
+
+
+def _insert_rows(model, rows):
+    stmt = insert(model).returning(getattr(model, primary_key(model).key), sort_by_parameter_order=True)
+    return db.session.execute(stmt, stamp_rows(model, [row for _, row in rows])).scalars().all()
+
+
+# One executemany INSERT for the batch. If a constraint rejects it (a unique
+# key repeated within the batch, or a concurrent writer), the batch is retried
+# row by row, each in its own savepoint, so only the offending items fail.
+def bulk_create(model, load_schema, items):
+    results, rows = _validate_items(model, load_schema, items)
+    created = []
+    if rows:
+        lock_for_rows(model, [row for _, row in rows])
+        try:
+            with db.session.begin_nested():
+                created = list(zip(rows, _insert_rows(model, rows)))
+        except IntegrityError:
+            for index, row in rows:
+                try:
+                    with db.session.begin_nested():
+                        created.append(((index, row), _insert_rows(model, [(index, row)])[0]))
+                except IntegrityError as e:
+                    results[index] = {'index': index, 'status': 'error', 'errors': {'_schema': [str(e.orig)]}}
+        if created:
+            apply_for_rows(model, [row for (_, row), _ in created])
+            reconcile_rows(model, [row for (_, row), _ in created])
+        db.session.commit()
+        pk = primary_key(model)
+        for (index, _), new_id in created:
+            results[index] = {'index': index, 'status': 'created', pk.key: new_id}
+    return results, len(created)
+
+
+def _dialect_insert(model, rows):
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in ('postgresql', 'sqlite'):
+        raise BulkError(f'Upserts are not supported on {dialect}')
+    dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    return dialect_insert(model.__table__).values(rows)
+
+
+def _upsert_statement(model, rows, key_columns):
+    stmt = _dialect_insert(model, rows)
+    updated = {name: stmt.excluded[name] for name in rows[0] if name not in key_columns}
+    table = model.__table__
+    return stmt.on_conflict_do_update(index_elements=list(key_columns), set_=updated) \
+        .returning(primary_key(model), *[table.c[name] for name in key_columns])
+
+
+# Inserts the rows capture_rows found no row for. A key another transaction
+# inserted after the capture conflicts; DO NOTHING waits for that transaction
+# to commit, and its row is then captured under lock so the upsert values the
+# overwrite against it instead of counting the row twice. Returns the ids of
+# the rows inserted here, by natural key.
+def _insert_new_rows(model, rows, key_columns, previous):
+    table = model.__table__
+    inserted = {}
+    rows = [row for row in rows if captured_key(model, row) not in previous]
+    while rows:
+        stmt = _dialect_insert(model, rows).on_conflict_do_nothing(index_elements=list(key_columns)) \
+            .returning(primary_key(model), *[table.c[name] for name in key_columns])
+        inserted.update({tuple(row[1:]): row[0] for row in db.session.execute(stmt)})
+        conflicts = [row for row in rows if tuple(row[name] for name in key_columns) not in inserted]
+        previous.update(capture_rows(model, conflicts))
+        # A conflicting row deleted again before the capture is retried
+        rows = [row for row in conflicts if captured_key(model, row) not in previous]
+    return inserted
+
+
+# Inserts rows whose natural key is new and updates the ones that exist, one
+# INSERT ... ON CONFLICT DO UPDATE per batch. Within a request the last item
+# for a given key wins; earlier ones are reported as superseded.
+def bulk_upsert(model, load_schema, items, key_columns):
+    results, rows = _validate_items(model, load_schema, items, key_columns)
+    latest = {}
+    for index, row in rows:
+        key = tuple(row[name] for name in key_columns)
+        if key in latest:
+            results[latest[key][0]] = {'index': latest[key][0], 'status': 'superseded', 'by': index}
+        latest[key] = (index, row)
+
+    batch_size = current_app.config.get('UPSERT_BATCH_SIZE', DEFAULT_UPSERT_BATCH_SIZE)
+    pending = list(latest.values())
+    if pending:
+        pk = primary_key(model)
+        stamp_rows(model, [row for _, row in pending])
+        previous = capture_rows(model, [row for _, row in pending])
+        # Items that omit optional fields must not overwrite them with NULL,
+        # so each distinct set of fields gets its own statements.
+        groups = {}
+        for index, row in pending:
+            groups.setdefault(tuple(sorted(row)), []).append((index, row))
+        for group in groups.values():
+            for start in range(0, len(group), batch_size):
+                batch = group[start:start + batch_size]
+                # RETURNING order is not guaranteed for multi-row VALUES, so ids
+                # are matched back to items through the natural key.
+                ids = {}
+                if model in CAPTURED_MODELS:
+                    ids = _insert_new_rows(model, [row for _, row in batch], key_columns, previous)
+                existing = [row for _, row in batch if tuple(row[name] for name in key_columns) not in ids]
+                if existing:
+                    result = db.session.execute(_upsert_statement(model, existing, key_columns))
+                    ids.update({tuple(row[1:]): row[0] for row in result})
+                for index, row in batch:
+                    results[index] = {'index': index, 'status': 'upserted',
+                                      pk.key: ids[tuple(row[name] for name in key_columns)]}
+        apply_for_rows(model, [row for _, row in pending], previous)
+        reconcile_rows(model, [row for _, row in pending])
+        db.session.commit()
+    return results, len(pending)
+
+
+def bulk_response(model, load_schema, items):
+    results, created = bulk_create(model, load_schema, items)
+    failed = len(results) - created
+    status = 201 if not failed else (207 if created else 400)
+    return {'created': created, 'failed': failed, 'results': results}, status
+
+
+def upsert_response(model, load_schema, items, key_columns):
+    results, upserted = bulk_upsert(model, load_schema, items, key_columns)
+    failed = sum(1 for result in results if result['status'] == 'error')
+    status = 200 if not failed else (207 if upserted else 400)
+    return {'upserted': upserted, 'failed': failed, 'results': results}, status
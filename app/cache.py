@@ -0,0 +1,290 @@
+# app/cache.py
+import gzip
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request
+from .compression import accepts_gzip, gzip_body, mark_gzipped, worth_compressing
+from .replicas import wants_primary
+from .streaming import NDJSON_MIMETYPE, wants_stream
+from .versioning import commit_hooks
+
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Link', 'X-Next-Cursor', 'Vary')
+
+
+class CacheError(RuntimeError):
+    pass
+
+
+# Backends store opaque bytes under a key together with the tags the value
+# depends on. invalidate(tags) makes every value carrying one of the tags
+# unreadable, in this process and, for shared backends, in every other one.
+# generation(tags) is read before a value is computed and passed to set(), so
+# a value computed from rows that changed meanwhile is never served.
+class Cache:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._counter_lock = threading.Lock()
+        self.hits = self.misses = self.invalidations = 0
+
+    def _count(self, hit):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        return {'backend': self.name, 'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses,
+                'invalidations': self.invalidations}
+
+
+class MemoryCache(Cache):
+    name = 'memory'
+
+    def __init__(self, max_entries=1024, ttl=300, clock=time.monotonic):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._invalidated_at = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key, tags=()):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self._count(entry is not None)
+        return None if entry is None else entry[2]
+
+    def generation(self, tags):
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def set(self, key, value, tags=(), generation=None):
+        with self._lock:
+            if generation is not None and generation != tuple(self._generations.get(tag, 0) for tag in tags):
+                return False
+            self._entries[key] = (self.clock() + self.ttl, frozenset(tags), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, tags):
+        tags = set(tags)
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                self._invalidated_at[tag] = self.clock()
+            stale = [key for key, entry in self._entries.items() if entry[1] & tags]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def invalidated_since(self, tags, seconds):
+        cutoff = self.clock() - seconds
+        with self._lock:
+            return any(self._invalidated_at.get(tag, float('-inf')) > cutoff for tag in tags)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._entries)
+        return dict(super().stats(), entries=entries, max_entries=self.max_entries, evictions=self.evictions)
+
+
+# Shared cache for all workers. Each tag has a generation counter; a value is
+# stored with the generations it was computed under and is stale as soon as
+# any of them has moved on, so invalidating a tag is a single INCR however
+# many keys carry it. Stale values are left for Redis to expire.
+class RedisCache(Cache):
+    name = 'redis'
+
+    def __init__(self, client, ttl=300, prefix='cache:'):
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        try:
+            import redis
+        except ImportError:
+            raise CacheError('CACHE_BACKEND=redis requires the redis package')
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def _tag_key(self, tag):
+        return f'{self.prefix}tag:{tag}'
+
+    def _stamp_key(self, tag):
+        return f'{self.prefix}tag-at:{tag}'
+
+    def _expiry(self):
+        # Redis expiries are whole seconds and must be at least 1
+        return max(1, math.ceil(self.ttl))
+
+    def get(self, key, tags=()):
+        pipe = self.client.pipeline(transaction=False)
+        if tags:
+            pipe.mget([self._tag_key(tag) for tag in tags])
+        pipe.get(self.prefix + key)
+        results = pipe.execute()
+        stored = results[-1]
+        value = None
+        if stored is not None:
+            header, _, data = stored.partition(b'\n')
+            current = [int(v or 0) for v in results[0]] if tags else []
+            if json.loads(header) == current:
+                value = data
+        self._count(value is not None)
+        return value
+
+    def generation(self, tags):
+        if not tags:
+            return ()
+        return tuple(int(v or 0) for v in self.client.mget([self._tag_key(tag) for tag in tags]))
+
+    def set(self, key, value, tags=(), generation=None):
+        generation = self.generation(tags) if generation is None else generation
+        self.client.set(self.prefix + key, json.dumps(list(generation)).encode() + b'\n' + value, ex=self._expiry())
+        return True
+
+    def invalidate(self, tags):
+        pipe = self.client.pipeline(transaction=False)
+        now = time.time()
+        for tag in tags:
+            pipe.incr(self._tag_key(tag))
+            pipe.set(self._stamp_key(tag), now, ex=self._expiry())
+        pipe.execute()
+        with self._counter_lock:
+            self.invalidations += len(tags)
+
+    def invalidated_since(self, tags, seconds):
+        stamps = self.client.mget([self._stamp_key(tag) for tag in tags])
+        cutoff = time.time() - seconds
+        return any(stamp is not None and float(stamp) > cutoff for stamp in stamps)
+
+
+def create_cache(config):
+    backend = config.get('CACHE_BACKEND', 'memory')
+    if backend == 'memory':
+        return MemoryCache(config['CACHE_MAX_ENTRIES'], config['CACHE_TTL_SECONDS'])
+    if backend == 'redis':
+        return RedisCache.from_url(config['CACHE_REDIS_URL'], ttl=config['CACHE_TTL_SECONDS'],
+                                   prefix=config['CACHE_KEY_PREFIX'])
+    raise CacheError(f"Unknown CACHE_BACKEND '{backend}'")
+
+
+def get_cache():
+    return current_app.extensions.get('response_cache')
+
+
+def _invalidate_committed(tables):
+    cache = get_cache()
+    if cache is not None:
+        try:
+            cache.invalidate(tables)
+        except Exception:
+            # The commit already happened; readers see the change once the TTL runs out
+            current_app.logger.exception('Cache invalidation failed for %s', ', '.join(sorted(tables)))
+
+
+def encode_entry(status, headers, body):
+    return json.dumps([status, headers]).encode() + b'\n' + body
+
+
+def decode_entry(data):
+    header, _, body = data.partition(b'\n')
+    status, headers = json.loads(header)
+    return status, headers, body
+
+
+def _cache_key():
+    fmt = NDJSON_MIMETYPE if wants_stream() else 'application/json'
+    return f'{fmt} {request.full_path}'
+
+
+# Large bodies are stored gzipped, so a hot list is compressed once when it
+# is cached rather than on every hit; the rare client that does not accept
+# gzip gets a decompressed copy.
+def _entry_from_response(response):
+    headers = [[name, response.headers[name]] for name in CACHED_HEADERS if name in response.headers]
+    body = response.get_data()
+    if worth_compressing(len(body)):
+        return encode_entry(response.status_code, headers + [['Content-Encoding', 'gzip']], gzip_body(body))
+    return encode_entry(response.status_code, headers, body)
+
+
+def _from_entry(data):
+    status, headers, body = decode_entry(data)
+    response = current_app.response_class(body, status=status, headers=headers)
+    if response.headers.get('Content-Encoding') == 'gzip':
+        if accepts_gzip():
+            mark_gzipped(response)
+        else:
+            del response.headers['Content-Encoding']
+            response.set_data(gzip.decompress(body))
+    return response.make_conditional(request)
+
+
+# Read-through cache for GET views of rarely written tables, keyed on the
+# full request path. Entries are invalidated by tag when a commit bumps one of
+# the tables and expire after CACHE_TTL_SECONDS; with the memory backend the
+# invalidation only reaches this process, so other workers rely on the TTL.
+# Goes outside @conditional so a hit answers both 200s and 304s without
+# touching the database.
+def cached(*models):
+    tags = tuple(model.__table__.name for model in models)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None or wants_primary():
+                return view(*args, **kwargs)
+            key = _cache_key()
+            try:
+                data = cache.get(key, tags)
+                generation = cache.generation(tags) if data is None else None
+            except Exception:
+                current_app.logger.exception('Cache lookup failed')
+                return view(*args, **kwargs)
+            if data is not None:
+                return _from_entry(data)
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            data = _entry_from_response(response)
+            try:
+                # A replica may not have replayed a commit we just invalidated
+                # for; caching its answer would pin the stale rows for a TTL.
+                if g.get('db_replica') is None or \
+                        not cache.invalidated_since(tags, current_app.config['READ_AFTER_WRITE_SECONDS']):
+                    cache.set(key, data, tags, generation)
+            except Exception:
+                current_app.logger.exception('Cache store failed')
+            return _from_entry(data)
+        return wrapper
+    return decorator
+
+
+def init_cache(app):
+    if app.config.get('CACHE_ENABLED'):
+        app.extensions['response_cache'] = create_cache(app.config)
+    if _invalidate_committed not in commit_hooks:
+        commit_hooks.append(_invalidate_committed)
@@ -0,0 +1,80 @@
+# app/commands.py
+import click
+from flask.cli import with_appcontext
+from . import db
+from .importing import import_inventory
+from .ledger import DEFAULT_SNAPSHOT_EVERY, take_snapshots
+from .models import Store
+from .reorder import ReorderPolicy, suggest_reorders
+from .summaries import refresh_store_summaries
+
+
+@click.command('import-inventory')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--delimiter', default=',', help="Field separator; use 'tab' for TSV files.")
+@with_appcontext
+def import_inventory_command(path, delimiter):
+    """Load inventory rows from a CSV or TSV file."""
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            report = import_inventory(f, '\t' if delimiter == 'tab' else delimiter)
+    except Exception:
+        db.session.rollback()
+        raise
+    click.echo(f'Imported {report.imported} rows, rejected {report.rejected}.')
+    for error in report.errors:
+        click.echo(f"  line {error['line']}: {error['error']}", err=True)
+
+
+@click.command('suggest-reorders')
+@click.option('--user-id', type=int, required=True, help='User recorded as the requester of the drafts.')
+@click.option('--lead-time-days', type=float, default=7, show_default=True)
+@click.option('--safety-days', type=float, default=3, show_default=True)
+@click.option('--review-days', type=float, default=14, show_default=True)
+@click.option('--history-days', type=click.FloatRange(min=0, min_open=True), default=30, show_default=True,
+              help='Period over which received stock was consumed.')
+@click.option('--dry-run', is_flag=True, help='Print suggestions without writing them.')
+@with_appcontext
+def suggest_reorders_command(user_id, lead_time_days, safety_days, review_days, history_days, dry_run):
+    """Create draft supply requests for inventory below its reorder point."""
+    policy = ReorderPolicy(lead_time_days, safety_days, review_days, history_days)
+    try:
+        report = suggest_reorders(user_id, policy, dry_run)
+    except Exception:
+        db.session.rollback()
+        raise
+    action = 'Would create' if dry_run else 'Created'
+    click.echo(f'Scanned {report.scanned} inventory rows. {action} {len(report.suggestions)} draft supply requests.')
+    if dry_run:
+        for suggestion in report.suggestions:
+            click.echo(f"  inventory {suggestion['inventory_id']}: {suggestion['quantity']}")
+
+
+@click.command('snapshot-stock')
+@click.option('--min-movements', type=int, default=DEFAULT_SNAPSHOT_EVERY, show_default=True,
+              help='Snapshot pairs with at least this many movements since their last snapshot.')
+@with_appcontext
+def snapshot_stock_command(min_movements):
+    """Snapshot stock per store and product so balance queries read a short tail of the ledger."""
+    try:
+        taken = take_snapshots(min_movements)
+    except Exception:
+        db.session.rollback()
+        raise
+    click.echo(f'Took {taken} snapshots.')
+
+
+@click.command('refresh-stock-summaries')
+@click.option('--store-id', 'store_ids', type=int, multiple=True, help='Store to recompute; repeat for several. Default: all.')
+@with_appcontext
+def refresh_stock_summaries_command(store_ids):
+    """Recompute store stock summaries from inventory, repairing any drift."""
+    try:
+        if not store_ids:
+            store_ids = db.session.execute(db.select(Store.store_id)).scalars().all()
+        refresh_store_summaries(db.session.connection(), store_ids)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    click.echo(f'Refreshed {len(store_ids)} store summaries.')
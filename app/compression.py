@@ -0,0 +1,73 @@
+# app/compression.py
+import gzip
+import zlib
+from flask import current_app, request
+from .streaming import NDJSON_MIMETYPE
+
+COMPRESSIBLE_MIMETYPES = {'application/json', NDJSON_MIMETYPE, 'text/csv', 'text/plain', 'text/html'}
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def accepts_gzip():
+    return current_app.config.get('COMPRESS_ENABLED') and request.accept_encodings['gzip'] > 0
+
+
+def gzip_body(data):
+    # mtime=0 keeps the output byte-identical for identical input
+    return gzip.compress(data, compresslevel=current_app.config['COMPRESS_LEVEL'], mtime=0)
+
+
+def worth_compressing(size):
+    return current_app.config.get('COMPRESS_ENABLED') and size >= current_app.config['COMPRESS_MIN_SIZE']
+
+
+# Marks a response as gzip-encoded. The ETag becomes weak since the encoded
+# bytes differ from the identity body; If-None-Match uses weak comparison, so
+# the same validator still yields a 304 either way.
+def mark_gzipped(response):
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _gzip_stream(chunks, level):
+    # Each chunk is sync-flushed so an NDJSON client can decode every batch
+    # as soon as it arrives instead of waiting for the end of the stream.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _compress_response(response):
+    if response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if not accepts_gzip():
+        return response
+    if response.is_streamed:
+        response.response = _gzip_stream(response.response, current_app.config['COMPRESS_LEVEL'])
+        response.headers.pop('Content-Length', None)
+        return mark_gzipped(response)
+    data = response.get_data()
+    if not worth_compressing(len(data)):
+        return response
+    response.set_data(gzip_body(data))
+    return mark_gzipped(response)
+
+
+def init_compression(app):
+    app.after_request(_compress_response)
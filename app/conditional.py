@@ -0,0 +1,55 @@
+# app/conditional.py
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import current_app, request
+from .errors import QueryError
+from .expansion import expanded_models, parse_expand
+from .streaming import NDJSON_MIMETYPE, wants_stream
+from .versioning import get_table_versions
+
+
+def compute_validators(models):
+    # Validators come from the per-table version counters, so a 304 costs one
+    # primary-key lookup and never touches the queried rows or the serializer.
+    # Expanded relationships make the response depend on their tables too.
+    try:
+        models = list(models) + expanded_models(models[0], parse_expand(models[0], request.args))
+    except QueryError:
+        pass  # the view reports the bad parameter
+    tables = list(dict.fromkeys(model.__table__.name for model in models))
+    versions = get_table_versions(tables)
+    parts = [f'{table}:{versions.get(table, (0, None))[0]}' for table in tables]
+    parts.append(request.full_path)
+    parts.append(NDJSON_MIMETYPE if wants_stream() else 'application/json')
+    etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    stamps = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+    last_modified = max(stamps).replace(tzinfo=timezone.utc, microsecond=0) if stamps else None
+    return etag, last_modified
+
+
+def is_not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return bool(last_modified and request.if_modified_since and last_modified <= request.if_modified_since)
+
+
+def conditional(*models):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = compute_validators(models)
+            if is_not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
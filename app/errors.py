@@ -0,0 +1,6 @@
+# app/errors.py
+
+
+# Raised for malformed query-string parameters; routes answer these with a 400
+class QueryError(ValueError):
+    pass
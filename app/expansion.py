@@ -0,0 +1,92 @@
+# app/expansion.py
+from functools import lru_cache
+from marshmallow import fields
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+from .errors import QueryError
+from .models import User, Product, Inventory, SupplyRequest, Store
+from .schemas import UserSchema, ProductSchema, InventorySchema, SupplyRequestSchema, StoreSchema
+
+# Relationships that ?expand= may render, and the schema each is nested with.
+# Expanded users never carry their password hash.
+EXPANDABLE = {
+    Inventory: {'product': (Product, ProductSchema), 'store': (Store, StoreSchema)},
+    SupplyRequest: {'inventory': (Inventory, InventorySchema), 'user': (User, UserSchema)},
+}
+NESTED_EXCLUDE = {User: ('password_hash',)}
+MAX_EXPAND_DEPTH = 2
+
+
+class ExpandError(QueryError):
+    pass
+
+
+# Parses ?expand=a,b.c into a sorted tuple of validated relationship paths
+def parse_expand(model, args):
+    requested = args.get('expand')
+    if not requested:
+        return ()
+    paths = set()
+    for path in (part.strip() for part in requested.split(',')):
+        if not path:
+            continue
+        current = model
+        names = path.split('.')
+        if len(names) > MAX_EXPAND_DEPTH:
+            raise ExpandError(f"'{path}' is nested deeper than {MAX_EXPAND_DEPTH} levels")
+        for name in names:
+            if name not in EXPANDABLE.get(current, {}):
+                choices = ', '.join(EXPANDABLE.get(current, {})) or 'none'
+                raise ExpandError(f"Cannot expand '{name}' on {current.__name__}. Expandable: {choices}")
+            current = EXPANDABLE[current][name][0]
+        paths.add(tuple(names))
+    return tuple(sorted(paths))
+
+
+def expanded_models(model, paths):
+    models = []
+    for path in paths:
+        current = model
+        for name in path:
+            current = EXPANDABLE[current][name][0]
+            if current not in models:
+                models.append(current)
+    return models
+
+
+def loader_options(model, paths):
+    # Many-to-one relationships are joined into the page query; collections
+    # would multiply rows under LIMIT, so those get one extra IN query each.
+    options = []
+    for path in paths:
+        option, current = None, model
+        for name in path:
+            relationship = inspect(current).relationships[name]
+            attribute = getattr(current, name)
+            loader = selectinload if relationship.uselist else joinedload
+            option = loader(attribute) if option is None else getattr(option, loader.__name__)(attribute)
+            current = relationship.mapper.class_
+        options.append(option)
+    return options
+
+
+@lru_cache(maxsize=128)
+def _expanded_schema_class(schema_cls, model, paths):
+    children = {}
+    for path in paths:
+        children.setdefault(path[0], []).append(path[1:])
+    attrs = {}
+    for name, subpaths in children.items():
+        target, target_schema = EXPANDABLE[model][name]
+        nested = _expanded_schema_class(target_schema, target, tuple(sorted(p for p in subpaths if p)))
+        attrs[name] = fields.Nested(nested, exclude=NESTED_EXCLUDE.get(target, ()), dump_only=True)
+    if not attrs:
+        return schema_cls
+    return type(f'Expanded{schema_cls.__name__}', (schema_cls,), attrs)
+
+
+@lru_cache(maxsize=128)
+def expanded_schema(schema, model, paths):
+    if not paths:
+        return schema
+    return _expanded_schema_class(type(schema), model, paths)(many=schema.many)
@@ -0,0 +1,47 @@
+# app/exporting.py
+import csv
+import io
+from flask import Response, request, stream_with_context
+from .errors import QueryError
+from .filters import filter_criteria
+from .serializers import project_schema
+from .streaming import iter_batches
+from .xlsx import iter_xlsx
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class ExportError(QueryError):
+    pass
+
+
+def _csv_chunks(header, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_response(model, schema, name):
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        raise ExportError("format must be 'csv' or 'xlsx'")
+    schema = project_schema(schema, request.args)
+    criteria = filter_criteria(model, request.args)
+    header = list(schema.dump_fields)
+
+    # Batches come straight off the server-side cursor, so an export of any
+    # size holds one batch in memory at a time.
+    rows = ([[item.get(key) for key in header] for item in batch] for batch in iter_batches(model, schema, criteria))
+    if export_format == 'csv':
+        body, mimetype = _csv_chunks(header, rows), 'text/csv'
+    else:
+        body, mimetype = iter_xlsx(name, header, rows), XLSX_MIMETYPE
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{export_format}'
+    return response
@@ -0,0 +1,119 @@
+# app/filters.py
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import Boolean, DateTime, Float, Integer, Numeric
+from .errors import QueryError
+from .models import User, Invitation, Product, Inventory, SupplyRequest, Payment, Store, StoreStockSummary, StockMovement
+
+# Query parameters consumed by the listing machinery rather than filters
+RESERVED_PARAMS = {'limit', 'cursor', 'sort', 'stream', 'fields', 'format', 'expand', 'group_by'}
+
+# Only these columns can be filtered on, so clients cannot force scans on
+# arbitrary columns: each one leads an index (primary key, unique key or
+# plain index). test_indexes checks that this stays true.
+FILTERABLE_FIELDS = {
+    User: ('user_id', 'username', 'email', 'updated_at', 'version'),
+    Invitation: ('user_id', 'email', 'expiry_date', 'updated_at', 'version'),
+    Product: ('product_id', 'sku', 'product_name', 'updated_at', 'version'),
+    Inventory: ('inventory_id', 'product_id', 'store_id', 'updated_at', 'version'),
+    SupplyRequest: ('request_id', 'inventory_id', 'user_id', 'status', 'request_date', 'updated_at', 'version'),
+    Payment: ('user_id', 'supplier_name', 'payment_date', 'updated_at', 'version'),
+    Store: ('store_id', 'updated_at', 'version'),
+    StoreStockSummary: ('store_id',),
+    StockMovement: ('movement_id', 'store_id', 'occurred_at'),
+}
+
+# __prefix compiles to LIKE 'abc%', which PostgreSQL only answers from an
+# index built with text_pattern_ops (outside the C collation)
+PREFIX_FIELDS = {
+    Product: ('product_name',),
+}
+
+OPERATORS = ('eq', 'in', 'gt', 'gte', 'lt', 'lte', 'range', 'prefix')
+
+
+class FilterError(QueryError):
+    pass
+
+
+def parse_value(column, raw):
+    column_type = column.type
+    try:
+        if isinstance(column_type, Boolean):
+            if raw.lower() not in ('true', 'false', '1', '0'):
+                raise ValueError
+            return raw.lower() in ('true', '1')
+        if isinstance(column_type, Integer):
+            return int(raw)
+        if isinstance(column_type, Float):
+            return float(raw)
+        if isinstance(column_type, Numeric):
+            return Decimal(raw)
+        if isinstance(column_type, DateTime):
+            return datetime.fromisoformat(raw)
+    except (ValueError, InvalidOperation):
+        raise FilterError(f"Invalid value '{raw}' for '{column.name}'")
+    return raw
+
+
+# A date-only upper bound on a timestamp column covers that whole day
+def _is_whole_day(column, raw):
+    if not isinstance(column.type, DateTime):
+        return False
+    try:
+        date.fromisoformat(raw)
+    except ValueError:
+        return False
+    return True
+
+
+def compile_filter(column, operator, raw):
+    if operator == 'eq':
+        return column == parse_value(column, raw)
+    if operator == 'in':
+        return column.in_([parse_value(column, value) for value in raw.split(',')])
+    if operator == 'gt':
+        return column > parse_value(column, raw)
+    if operator == 'gte':
+        return column >= parse_value(column, raw)
+    if operator == 'lt':
+        return column < parse_value(column, raw)
+    if operator == 'lte':
+        return column <= parse_value(column, raw)
+    if operator == 'range':
+        bounds = raw.split(',')
+        if len(bounds) != 2:
+            raise FilterError(f"'{column.name}__range' expects two comma-separated bounds")
+        low, high = bounds
+        criteria = []
+        if low:
+            criteria.append(column >= parse_value(column, low))
+        if high and _is_whole_day(column, high):
+            criteria.append(column < parse_value(column, high) + timedelta(days=1))
+        elif high:
+            criteria.append(column <= parse_value(column, high))
+        return criteria
+    return column.startswith(raw, autoescape=True)
+
+
+# Compile field=value and field__op=value query parameters into WHERE clauses
+def filter_criteria(model, args):
+    allowed = FILTERABLE_FIELDS.get(model, ())
+    criteria = []
+    for param, values in args.lists():
+        if param in RESERVED_PARAMS:
+            continue
+        name, _, operator = param.partition('__')
+        operator = operator or 'eq'
+        if name not in allowed:
+            raise FilterError(f"Cannot filter on '{name}'. Filterable fields: {', '.join(allowed)}")
+        if operator not in OPERATORS:
+            raise FilterError(f"Unknown filter operator '{operator}'. Use one of: {', '.join(OPERATORS)}")
+        if operator == 'prefix' and name not in PREFIX_FIELDS.get(model, ()):
+            prefixable = ', '.join(PREFIX_FIELDS.get(model, ())) or 'none'
+            raise FilterError(f"'prefix' is not supported on '{name}'. Prefix-searchable fields: {prefixable}")
+        column = model.__table__.columns[name]
+        for raw in values:
+            compiled = compile_filter(column, operator, raw)
+            criteria.extend(compiled if isinstance(compiled, list) else [compiled])
+    return criteria
@@ -0,0 +1,183 @@
+# app/importing.py
+import csv
+import heapq
+import io
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, func, insert, literal, or_, select
+from . import db
+from .errors import QueryError
+from .ledger import reconcile_where
+from .models import Inventory, Product, Store
+from .summaries import add_delta, apply_deltas, lock_prices
+from .versioning import PENDING_VERSION, mark_changed
+
+IMPORT_COLUMNS = ('product_id', 'store_id', 'quantity_received', 'quantity_in_stock', 'quantity_spoilt', 'payment_status')
+IMPORT_BATCH_SIZE = 50000
+MAX_REPORTED_ERRORS = 1000
+
+staging_metadata = MetaData()
+inventory_staging = Table(
+    'inventory_import', staging_metadata,
+    Column('line', Integer, nullable=False),
+    Column('product_id', Integer, nullable=False),
+    Column('store_id', Integer, nullable=False),
+    Column('quantity_received', Integer, nullable=False),
+    Column('quantity_in_stock', Integer, nullable=False),
+    Column('quantity_spoilt', Integer, nullable=False),
+    Column('payment_status', String(10), nullable=False),
+    Index('ix_inventory_import_store_id_product_id', 'store_id', 'product_id', 'line'),
+    prefixes=['TEMPORARY'],
+)
+
+
+class CsvImportError(QueryError):
+    pass
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        # Max-heap on line number, so the MAX_REPORTED_ERRORS earliest lines
+        # are kept whatever order parsing and merging find them in
+        self._errors = []
+
+    def reject(self, line, message):
+        self.rejected += 1
+        entry = (-line, message)
+        if len(self._errors) < MAX_REPORTED_ERRORS:
+            heapq.heappush(self._errors, entry)
+        elif entry > self._errors[0]:
+            heapq.heapreplace(self._errors, entry)
+
+    @property
+    def errors(self):
+        return [{'line': -line, 'error': message} for line, message in sorted(self._errors, reverse=True)]
+
+    def to_dict(self):
+        return {'imported': self.imported, 'rejected': self.rejected, 'errors': self.errors}
+
+
+def parse_row(record):
+    row = {}
+    for name in IMPORT_COLUMNS[:-1]:
+        value = (record.get(name) or '').strip()
+        if not value.isdigit():
+            raise ValueError(f"'{name}' must be a non-negative integer, got '{value}'")
+        row[name] = int(value)
+    status = (record.get('payment_status') or '').strip()
+    if not status or len(status) > 10:
+        raise ValueError("'payment_status' must be 1 to 10 characters")
+    row['payment_status'] = status
+    return row
+
+
+def _copy_batch(connection, batch):
+    if connection.dialect.name == 'postgresql':
+        # COPY streams the whole batch in one round trip
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow([row['line']] + [row[name] for name in IMPORT_COLUMNS])
+        buffer.seek(0)
+        with connection.connection.driver_connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY inventory_import (line, {', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    else:
+        connection.execute(inventory_staging.insert(), batch)
+
+
+def _merge_staged(connection, report):
+    products = Product.__table__
+    stores = Store.__table__
+    inventory = Inventory.__table__
+    staged = inventory_staging.c
+    earlier = inventory_staging.alias('earlier')
+
+    # (store_id, product_id) is unique in inventory: rows for a pair that is
+    # already stocked belong in the upsert endpoint, and only the first line
+    # for a pair within the file is kept.
+    exists_in_inventory = select(inventory.c.inventory_id).where(
+        inventory.c.store_id == staged.store_id, inventory.c.product_id == staged.product_id).exists()
+    duplicate_in_file = select(earlier.c.line).where(
+        earlier.c.store_id == staged.store_id, earlier.c.product_id == staged.product_id,
+        earlier.c.line < staged.line).exists()
+
+    rejects = select(staged.line, products.c.product_id, stores.c.store_id, exists_in_inventory) \
+        .outerjoin(products, products.c.product_id == staged.product_id) \
+        .outerjoin(stores, stores.c.store_id == staged.store_id) \
+        .where(or_(products.c.product_id.is_(None), stores.c.store_id.is_(None), exists_in_inventory, duplicate_in_file)) \
+        .order_by(staged.line)
+    for line, product_id, store_id, stocked in connection.execute(rejects):
+        if product_id is None:
+            report.reject(line, 'Unknown product_id')
+        elif store_id is None:
+            report.reject(line, 'Unknown store_id')
+        elif stocked:
+            report.reject(line, 'Inventory for this store and product already exists')
+        else:
+            report.reject(line, 'Duplicate store_id and product_id in file')
+
+    now = datetime.utcnow()
+    mark_changed(inventory.name)
+    lock_prices(connection, select(staged.product_id))
+    valid = select(*[staged[name] for name in IMPORT_COLUMNS], literal(PENDING_VERSION), literal(now)) \
+        .join(products, products.c.product_id == staged.product_id) \
+        .join(stores, stores.c.store_id == staged.store_id) \
+        .where(~exists_in_inventory, ~duplicate_in_file)
+    # Per-store totals of the rows about to be inserted, aggregated in the
+    # database, become the summary deltas
+    imported = valid.subquery()
+    in_stock = imported.c.quantity_in_stock
+    totals = select(
+        imported.c.store_id, func.count().label('product_count'),
+        func.sum(imported.c.quantity_received).label('units_received'), func.sum(in_stock).label('units_in_stock'),
+        func.sum(imported.c.quantity_spoilt).label('units_spoilt'),
+        func.sum(in_stock * func.coalesce(products.c.buying_price, 0)).label('stock_value_at_cost'),
+        func.sum(in_stock * func.coalesce(products.c.selling_price, 0)).label('stock_value_at_retail'),
+    ).join(products, products.c.product_id == imported.c.product_id).group_by(imported.c.store_id)
+    deltas = {}
+    for row in connection.execute(totals):
+        add_delta(deltas, row.store_id, **{name: value for name, value in row._mapping.items() if name != 'store_id'})
+
+    result = connection.execute(insert(inventory).from_select(list(IMPORT_COLUMNS) + ['version', 'updated_at'], valid))
+    report.imported = result.rowcount
+    apply_deltas(connection, deltas)
+    # Every merged row is still pending until this transaction commits
+    reconcile_where(connection, inventory.c.version == PENDING_VERSION)
+
+
+# Validates a CSV/TSV stream row by row, stages the valid rows in a temporary
+# table and merges them into inventory with one INSERT ... SELECT that drops
+# rows referencing unknown products or stores. Nothing is imported unless the
+# merge commits; on error the caller rolls back, which also drops the
+# staging table.
+def import_inventory(text_stream, delimiter=','):
+    reader = csv.DictReader(text_stream, delimiter=delimiter)
+    missing = [name for name in IMPORT_COLUMNS if name not in (reader.fieldnames or ())]
+    if missing:
+        raise CsvImportError(f"Missing columns: {', '.join(missing)}")
+
+    batch_size = current_app.config.get('IMPORT_BATCH_SIZE', IMPORT_BATCH_SIZE)
+    report = ImportReport()
+    connection = db.session.connection()
+    inventory_staging.create(connection)
+    batch = []
+    for record in reader:
+        try:
+            row = parse_row(record)
+        except ValueError as e:
+            report.reject(reader.line_num, str(e))
+            continue
+        row['line'] = reader.line_num
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _copy_batch(connection, batch)
+            batch = []
+    if batch:
+        _copy_batch(connection, batch)
+    _merge_staged(connection, report)
+    inventory_staging.drop(connection)
+    db.session.commit()
+    return report
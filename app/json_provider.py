@@ -0,0 +1,72 @@
+# app/json_provider.py
+from datetime import date, datetime, time
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.engine import Row
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only where orjson is missing
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, Decimal):
+        return str(o)
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, Row):
+        return dict(o._mapping)
+    return DefaultJSONProvider.default(o)
+
+
+# Stdlib encoder with the same output as OrjsonProvider: Decimals as strings
+# (so prices keep their scale), datetimes as ISO 8601, rows as objects, and
+# keys in the order the serializers produce them.
+class StdlibJSONProvider(DefaultJSONProvider):
+    name = 'stdlib'
+    default = staticmethod(_default)
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if 'indent' not in kwargs:
+            kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs)
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    name = 'orjson'
+
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # orjson has no equivalent for arbitrary json.dumps arguments
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+# JSON_PROVIDER is 'auto' (orjson when installed), 'orjson' or 'stdlib'
+def create_json_provider(app):
+    choice = app.config.get('JSON_PROVIDER', 'auto')
+    if choice == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_PROVIDER=orjson requires the orjson package')
+    if choice == 'stdlib' or orjson is None:
+        return StdlibJSONProvider(app)
+    return OrjsonProvider(app)
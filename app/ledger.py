@@ -0,0 +1,323 @@
+# app/ledger.py
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import and_, bindparam, event, func, inspect, insert, literal, select, tuple_, update
+from . import db
+from .errors import QueryError
+from .models import Inventory, StockMovement, StockSnapshot, User
+from .summaries import add_delta, apply_deltas, lock_prices, prices
+from .versioning import PENDING_VERSION, mark_changed
+
+movements = StockMovement.__table__
+snapshots = StockSnapshot.__table__
+inventory = Inventory.__table__
+users = User.__table__
+
+MOVEMENT_KINDS = ('receipt', 'sale', 'spoilage', 'transfer', 'adjustment')
+RECONCILE_REFERENCE = 'reconcile'
+DEFAULT_SNAPSHOT_EVERY = 1000
+SNAPSHOT_BATCH_SIZE = 1000
+
+
+class LedgerError(QueryError):
+    pass
+
+
+class InsufficientStock(LedgerError):
+    pass
+
+
+def _pair_filter(table, pairs=None, store_id=None):
+    if pairs is not None:
+        return tuple_(table.c.store_id, table.c.product_id).in_(pairs)
+    return table.c.store_id == store_id
+
+
+# Stock on hand per (store_id, product_id), as of `at` or now: the latest
+# snapshot at or before that time plus the movements after it. Snapshots
+# keep the tail short however long the ledger grows. Pairs whose opening
+# balance was taken after `at` have no known history then and map to None.
+def balances(connection, pairs=None, store_id=None, at=None):
+    snapshot_scope = [_pair_filter(snapshots, pairs, store_id)]
+    movement_scope = [_pair_filter(movements, pairs, store_id)]
+    if at is not None:
+        snapshot_scope.append(snapshots.c.as_of <= at)
+        movement_scope.append(movements.c.occurred_at <= at)
+
+    latest = select(snapshots.c.store_id, snapshots.c.product_id, func.max(snapshots.c.movement_id).label('movement_id')) \
+        .where(*snapshot_scope).group_by(snapshots.c.store_id, snapshots.c.product_id).subquery()
+    on_latest = and_(latest.c.store_id == snapshots.c.store_id, latest.c.product_id == snapshots.c.product_id,
+                     latest.c.movement_id == snapshots.c.movement_id)
+    result = {(row.store_id, row.product_id): row.quantity_in_stock for row in connection.execute(
+        select(snapshots.c.store_id, snapshots.c.product_id, snapshots.c.quantity_in_stock).join(latest, on_latest))}
+
+    tail = select(movements.c.store_id, movements.c.product_id, func.sum(movements.c.quantity).label('quantity')) \
+        .outerjoin(latest, and_(latest.c.store_id == movements.c.store_id, latest.c.product_id == movements.c.product_id)) \
+        .where(*movement_scope, movements.c.movement_id > func.coalesce(latest.c.movement_id, 0)) \
+        .group_by(movements.c.store_id, movements.c.product_id)
+    for row in connection.execute(tail):
+        pair = (row.store_id, row.product_id)
+        result[pair] = result.get(pair, 0) + row.quantity
+
+    if at is not None:
+        unknown = select(snapshots.c.store_id, snapshots.c.product_id) \
+            .where(_pair_filter(snapshots, pairs, store_id), snapshots.c.movement_id == 0, snapshots.c.as_of > at)
+        for row in connection.execute(unknown):
+            result.setdefault((row.store_id, row.product_id), None)
+    return result
+
+
+# Stock per product of one store for the API, optionally as of ?at= and for
+# the given ?product_id= values only
+def stock_levels(store_id, args):
+    at = None
+    if args.get('at'):
+        try:
+            at = datetime.fromisoformat(args['at'])
+        except ValueError:
+            raise LedgerError('at must be an ISO 8601 date or time')
+        if at.tzinfo is not None:
+            at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    try:
+        product_ids = [int(value) for value in args.getlist('product_id')]
+    except ValueError:
+        raise LedgerError('product_id must be an integer')
+    pairs = [(store_id, product_id) for product_id in product_ids] if product_ids else None
+    levels = balances(db.session.connection(), pairs, store_id, at)
+    return [{'product_id': product_id, 'quantity_in_stock': quantity}
+            for (_, product_id), quantity in sorted(levels.items())]
+
+
+# Locks the inventory rows of the given pairs in a fixed order. Every ledger
+# writer takes these locks before appending, so movements of one pair are
+# appended in id order and a snapshot never misses an uncommitted movement.
+# table_versions is only locked at commit (versioning._publish_versions),
+# after every row lock, so it cannot deadlock with these.
+def _lock_inventory(connection, pairs):
+    rows = connection.execute(
+        select(inventory.c.inventory_id, inventory.c.store_id, inventory.c.product_id, inventory.c.quantity_in_stock)
+        .where(_pair_filter(inventory, sorted(pairs)))
+        .order_by(inventory.c.store_id, inventory.c.product_id).with_for_update()
+    )
+    return {(row.store_id, row.product_id): row for row in rows}
+
+
+def _append(connection, entries, now):
+    mark_changed(movements.name)
+    for entry in entries:
+        entry.setdefault('occurred_at', now)
+    stmt = insert(movements).returning(movements.c.movement_id, sort_by_parameter_order=True)
+    return connection.execute(stmt, entries).scalars().all()
+
+
+# Parses one API movement into ledger entries: positive quantities, signed
+# by kind, except adjustments which carry their own sign.
+def movement_entries(data):
+    if not isinstance(data, dict):
+        raise LedgerError('Each movement must be a JSON object')
+    kind = data.get('kind')
+    if kind not in MOVEMENT_KINDS:
+        raise LedgerError(f"kind must be one of: {', '.join(MOVEMENT_KINDS)}")
+    try:
+        store_id, product_id, quantity = int(data['store_id']), int(data['product_id']), int(data['quantity'])
+    except (KeyError, TypeError, ValueError):
+        raise LedgerError('store_id, product_id and quantity are required integers')
+    try:
+        to_store_id = int(data['to_store_id']) if data.get('to_store_id') is not None else None
+    except (TypeError, ValueError):
+        raise LedgerError('to_store_id must be an integer')
+    try:
+        user_id = int(data['user_id']) if data.get('user_id') is not None else None
+    except (TypeError, ValueError):
+        raise LedgerError('user_id must be an integer')
+    if quantity == 0 or (kind != 'adjustment' and quantity < 0):
+        raise LedgerError('quantity must be positive' if kind != 'adjustment' else 'quantity must not be zero')
+
+    entry = {'store_id': store_id, 'product_id': product_id, 'kind': kind, 'reference': data.get('reference'),
+             'user_id': user_id}
+    if kind == 'transfer':
+        if to_store_id is None or to_store_id == store_id:
+            raise LedgerError('A transfer needs a to_store_id different from store_id')
+        reference = data.get('reference') or f'transfer:{uuid.uuid4().hex}'
+        return [dict(entry, quantity=-quantity, reference=reference),
+                dict(entry, store_id=to_store_id, quantity=quantity, reference=reference)]
+    return [dict(entry, quantity=-quantity if kind in ('sale', 'spoilage') else quantity)]
+
+
+# Appends movements and applies them to inventory in the caller's
+# transaction. Quantities are changed with relative UPDATEs under the row
+# lock, so concurrent movements never overwrite each other.
+def record_movements(entries):
+    if not entries:
+        raise LedgerError('At least one movement is required')
+    connection = db.session.connection()
+    user_ids = sorted({entry['user_id'] for entry in entries if entry.get('user_id') is not None})
+    if user_ids:
+        # FOR KEY SHARE, as the foreign key check would take, so the users
+        # cannot be deleted before the movements referencing them are written
+        found = set(connection.execute(select(users.c.user_id).where(users.c.user_id.in_(user_ids))
+                                       .with_for_update(read=True, key_share=True)).scalars())
+        missing = [user_id for user_id in user_ids if user_id not in found]
+        if missing:
+            raise LedgerError(f'User {missing[0]} does not exist')
+    pairs = {(entry['store_id'], entry['product_id']) for entry in entries}
+    now = datetime.utcnow()
+    mark_changed(inventory.name)
+    lock_prices(connection, sorted({product_id for _, product_id in pairs}))
+    locked = _lock_inventory(connection, pairs)
+    missing = sorted(pairs - set(locked))
+    if missing:
+        raise LedgerError(f'No inventory for store {missing[0][0]} and product {missing[0][1]}')
+
+    changes = {}
+    for entry in entries:
+        change = changes.setdefault((entry['store_id'], entry['product_id']), {'stock': 0, 'received': 0, 'spoilt': 0})
+        change['stock'] += entry['quantity']
+        if entry['kind'] == 'receipt':
+            change['received'] += entry['quantity']
+        elif entry['kind'] == 'spoilage':
+            change['spoilt'] -= entry['quantity']
+    for pair, change in changes.items():
+        if locked[pair].quantity_in_stock + change['stock'] < 0:
+            raise InsufficientStock(f'Only {locked[pair].quantity_in_stock} units of product {pair[1]} '
+                                    f'in stock at store {pair[0]}')
+
+    connection.execute(
+        update(inventory).where(inventory.c.inventory_id == bindparam('b_inventory_id')).values(
+            quantity_in_stock=inventory.c.quantity_in_stock + bindparam('d_stock'),
+            quantity_received=inventory.c.quantity_received + bindparam('d_received'),
+            quantity_spoilt=inventory.c.quantity_spoilt + bindparam('d_spoilt'),
+            version=PENDING_VERSION, updated_at=now,
+        ),
+        [{'b_inventory_id': locked[pair].inventory_id, 'd_stock': change['stock'], 'd_received': change['received'],
+          'd_spoilt': change['spoilt']} for pair, change in sorted(changes.items())],
+    )
+    ids = _append(connection, entries, now)
+    deltas = {}
+    product_prices = prices(connection, {product_id for _, product_id in changes})
+    for (store_id, product_id), change in changes.items():
+        buying, selling = product_prices[product_id]
+        add_delta(deltas, store_id, units_received=change['received'], units_in_stock=change['stock'],
+                  units_spoilt=change['spoilt'], stock_value_at_cost=change['stock'] * buying,
+                  stock_value_at_retail=change['stock'] * selling)
+    apply_deltas(connection, deltas)
+    return ids
+
+
+# Writes that set quantity_in_stock directly (the inventory routes, bulk
+# upserts, CSV import, other services) are recorded as adjustment movements
+# for the difference, so the ledger always adds up to the inventory table.
+def reconcile(connection, pairs):
+    pairs = {pair for pair in pairs if None not in pair}
+    if not pairs:
+        return []
+    locked = _lock_inventory(connection, pairs)
+    ledger = balances(connection, sorted(pairs))
+    entries = []
+    for pair in sorted(pairs):
+        target = locked[pair].quantity_in_stock if pair in locked else 0
+        difference = target - (ledger.get(pair) or 0)
+        if difference:
+            entries.append({'store_id': pair[0], 'product_id': pair[1], 'kind': 'adjustment',
+                            'quantity': difference, 'reference': RECONCILE_REFERENCE, 'user_id': None})
+    return _append(connection, entries, datetime.utcnow()) if entries else []
+
+
+def _same_pair(left, right):
+    return and_(left.c.store_id == right.c.store_id, left.c.product_id == right.c.product_id)
+
+
+# Set-based reconcile of the inventory rows matching `criteria`, for writes
+# too large to bring into Python (see importing.py): one INSERT ... SELECT
+# computes each row's difference from its ledger balance in the database.
+# The caller must already hold the rows, e.g. by having just inserted them.
+def reconcile_where(connection, *criteria):
+    pairs = select(inventory.c.store_id, inventory.c.product_id).where(*criteria).subquery()
+    latest = select(snapshots.c.store_id, snapshots.c.product_id, func.max(snapshots.c.movement_id).label('movement_id')) \
+        .join(pairs, _same_pair(snapshots, pairs)).group_by(snapshots.c.store_id, snapshots.c.product_id).subquery()
+    opening = select(snapshots.c.store_id, snapshots.c.product_id, snapshots.c.quantity_in_stock) \
+        .join(latest, and_(_same_pair(snapshots, latest), snapshots.c.movement_id == latest.c.movement_id)).subquery()
+    tail = select(movements.c.store_id, movements.c.product_id, func.sum(movements.c.quantity).label('quantity')) \
+        .join(pairs, _same_pair(movements, pairs)) \
+        .outerjoin(latest, _same_pair(movements, latest)) \
+        .where(movements.c.movement_id > func.coalesce(latest.c.movement_id, 0)) \
+        .group_by(movements.c.store_id, movements.c.product_id).subquery()
+
+    now = datetime.utcnow()
+    difference = inventory.c.quantity_in_stock - func.coalesce(opening.c.quantity_in_stock, 0) \
+        - func.coalesce(tail.c.quantity, 0)
+    adjustments = select(inventory.c.store_id, inventory.c.product_id, literal('adjustment'), difference,
+                         literal(RECONCILE_REFERENCE), literal(now)) \
+        .outerjoin(opening, _same_pair(inventory, opening)) \
+        .outerjoin(tail, _same_pair(inventory, tail)) \
+        .where(*criteria, difference != 0) \
+        .order_by(inventory.c.store_id, inventory.c.product_id)
+    mark_changed(movements.name)
+    columns = ['store_id', 'product_id', 'kind', 'quantity', 'reference', 'occurred_at']
+    return connection.execute(insert(movements).from_select(columns, adjustments)).rowcount
+
+
+def _stock_changed(instance):
+    state = inspect(instance)
+    return any(state.attrs[name].history.has_changes() for name in ('store_id', 'product_id', 'quantity_in_stock'))
+
+
+def _reconcile_flushed(session, flush_context):
+    pairs = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Inventory) and (instance not in session.dirty or _stock_changed(instance)):
+            state = inspect(instance)
+            pairs.add((instance.store_id, instance.product_id))
+            # A row moved to another store or product leaves the old pair at zero
+            old_store = (state.attrs.store_id.history.deleted or [instance.store_id])[0]
+            old_product = (state.attrs.product_id.history.deleted or [instance.product_id])[0]
+            pairs.add((old_store, old_product))
+    if pairs:
+        reconcile(session.connection(), pairs)
+
+
+# For set-based inventory writes that bypass the unit of work (see bulk.py)
+def reconcile_rows(model, rows):
+    if model is Inventory:
+        reconcile(db.session.connection(), {(row.get('store_id'), row.get('product_id')) for row in rows})
+
+
+# Snapshots every pair with at least min_movements movements since its last
+# snapshot, a batch of pairs per transaction. Each inventory pair is checked
+# from its own high-water mark, the movement_id of its latest snapshot: the
+# min_movements-th movement after it is looked up on the (store_id,
+# product_id, movement_id) index, so no pair reads more than min_movements
+# index entries and the ledger is never scanned as a whole.
+def take_snapshots(min_movements=DEFAULT_SNAPSHOT_EVERY, batch_size=SNAPSHOT_BATCH_SIZE):
+    high_water = select(func.coalesce(func.max(snapshots.c.movement_id), 0)) \
+        .where(_same_pair(snapshots, inventory)).correlate(inventory).scalar_subquery()
+    nth_since = select(movements.c.movement_id) \
+        .where(_same_pair(movements, inventory), movements.c.movement_id > high_water) \
+        .order_by(movements.c.movement_id).offset(max(min_movements, 1) - 1).limit(1).scalar_subquery()
+    due = select(inventory.c.store_id, inventory.c.product_id).where(nth_since.is_not(None)) \
+        .order_by(inventory.c.store_id, inventory.c.product_id)
+    pairs = [tuple(row) for row in db.session.execute(due)]
+
+    taken = 0
+    for start in range(0, len(pairs), batch_size):
+        batch = pairs[start:start + batch_size]
+        connection = db.session.connection()
+        _lock_inventory(connection, batch)
+        ledger = balances(connection, batch)
+        heads = connection.execute(
+            select(movements.c.store_id, movements.c.product_id, func.max(movements.c.movement_id).label('movement_id'),
+                   func.max(movements.c.occurred_at).label('as_of'))
+            .where(_pair_filter(movements, batch)).group_by(movements.c.store_id, movements.c.product_id)
+        ).all()
+        rows = [{'store_id': head.store_id, 'product_id': head.product_id, 'movement_id': head.movement_id,
+                 'as_of': head.as_of, 'quantity_in_stock': ledger[(head.store_id, head.product_id)]} for head in heads]
+        if rows:
+            connection.execute(insert(snapshots), rows)
+        db.session.commit()
+        taken += len(rows)
+    return taken
+
+
+def init_ledger():
+    if not event.contains(db.session, 'after_flush', _reconcile_flushed):
+        event.listen(db.session, 'after_flush', _reconcile_flushed)
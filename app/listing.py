@@ -0,0 +1,40 @@
+# app/listing.py
+from flask import current_app, jsonify, request
+from sqlalchemy import select
+from . import db
+from .expansion import expanded_schema, loader_options, parse_expand
+from .filters import filter_criteria
+from .pagination import paginate, page_headers, primary_key
+from .serializers import compile_serializer, project_schema
+from .streaming import ndjson_response, wants_stream
+
+
+def list_response(model, schema):
+    paths = parse_expand(model, request.args)
+    schema = project_schema(expanded_schema(schema, model, paths), request.args)
+    options = loader_options(model, paths)
+    criteria = filter_criteria(model, request.args)
+    if wants_stream():
+        return ndjson_response(model, schema, criteria, options)
+    if current_app.config.get('FAST_SERIALIZATION') and not options:
+        # Read-only lists select just the schema's columns and build dicts
+        # straight from the row tuples, skipping ORM hydration entirely.
+        serializer = compile_serializer(schema)
+        page = paginate(model, serializer.columns, criteria)
+        items = serializer.dump_rows(page.items)
+    else:
+        page = paginate(model, criteria=criteria, options=options)
+        items = schema.dump(page.items)
+    return jsonify(items), 200, page_headers(page)
+
+
+# Returns the serialized row with the given primary key, or None if there is none
+def fetch_detail(model, schema, id):
+    paths = parse_expand(model, request.args)
+    schema = project_schema(expanded_schema(schema, model, paths), request.args)
+    if current_app.config.get('FAST_SERIALIZATION') and not paths:
+        serializer = compile_serializer(schema)
+        row = db.session.execute(select(*serializer.columns).where(primary_key(model) == id)).first()
+        return None if row is None else serializer(row)
+    item = db.session.get(model, id, options=loader_options(model, paths))
+    return None if item is None else schema.dump(item)
@@ -1,7 +1,14 @@
 from datetime import datetime
 from . import db
 
-class User(db.Model):
+# Stamped on every write (see versioning.py): updated_at is the wall-clock
+# time and version is the table's change counter at the time of the write,
+# so "rows changed since version N" is a single index range scan.
+class VersionedMixin:
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0, index=True)
+
+class User(VersionedMixin, db.Model):
     __tablename__ = 'users'
 
     user_id = db.Column(db.Integer, primary_key=True)
@@ -14,57 +21,66 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
-class Invitation(db.Model):
+class Invitation(VersionedMixin, db.Model):
     __tablename__ = 'invitations'
 
     user_id = db.Column(db.Integer, primary_key=True)
     token = db.Column(db.String(50), unique=True, nullable=False)
     email = db.Column(db.String(50), unique=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    expiry_date = db.Column(db.DateTime)
+    expiry_date = db.Column(db.DateTime, index=True)
     is_used = db.Column(db.Boolean, default=False)
 
     def __repr__(self):
         return f'<Invitation {self.email}>'
 
-class Product(db.Model):
+class Product(VersionedMixin, db.Model):
     __tablename__ = 'products'
 
     product_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    sku = db.Column(db.String(50), unique=True)
     product_name = db.Column(db.String, nullable=False)
     buying_price = db.Column(db.Numeric)
     selling_price = db.Column(db.Numeric)
 
+    __table_args__ = (db.Index('ix_products_product_name', 'product_name',
+                               postgresql_ops={'product_name': 'text_pattern_ops'}),)
+
     inventories = db.relationship('Inventory', back_populates='product', overlaps="products,inventories")
 
     def __repr__(self):
         return f'<Product {self.product_id}>'
 
-class Inventory(db.Model):
+class Inventory(VersionedMixin, db.Model):
     __tablename__ = 'inventory'
 
     inventory_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id'), nullable=False, index=True)
     store_id = db.Column(db.Integer, db.ForeignKey('stores.store_id'), nullable=False)
     quantity_received = db.Column(db.Integer, nullable=False)
     quantity_in_stock = db.Column(db.Integer, nullable=False)
     quantity_spoilt = db.Column(db.Integer, nullable=False)
     payment_status = db.Column(db.String(10), nullable=False)
 
+    __table_args__ = (db.UniqueConstraint('store_id', 'product_id', name='uq_inventory_store_id_product_id'),)
+
     product = db.relationship('Product', back_populates='inventories', overlaps="inventories,product")
     store = db.relationship('Store', backref=db.backref('inventories', lazy=True), overlaps="inventories,store")
 
     def __repr__(self):
         return f'<Inventory {self.inventory_id}>'
 
-class SupplyRequest(db.Model):
+class SupplyRequest(VersionedMixin, db.Model):
     __tablename__ = 'supply_requests'
 
     request_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.inventory_id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
-    request_date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.inventory_id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False, index=True)
+    request_date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     status = db.Column(db.String(10), nullable=False)
+    quantity = db.Column(db.Integer)
+
+    __table_args__ = (db.Index('ix_supply_requests_status_request_date', 'status', 'request_date'),)
 
     inventory = db.relationship('Inventory', backref=db.backref('supply_requests', lazy=True))
     user = db.relationship('User', backref=db.backref('supply_requests', lazy=True))
@@ -72,20 +88,20 @@ class SupplyRequest(db.Model):
     def __repr__(self):
         return f'<SupplyRequest {self.request_id}>'
 
-class Payment(db.Model):
+class Payment(VersionedMixin, db.Model):
     __tablename__ = 'payments'
 
     user_id = db.Column(db.Integer, primary_key=True)
-    supplier_name = db.Column(db.String(25), nullable=False)
+    supplier_name = db.Column(db.String(25), nullable=False, index=True)
     invoice_number = db.Column(db.String(50), nullable=False)
     amount = db.Column(db.Float, nullable=False)
-    payment_date = db.Column(db.DateTime, default=datetime.utcnow)
+    payment_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     payment_status = db.Column(db.String(10), nullable=False)
 
     def __repr__(self):
         return f'<Payment {self.id}>'
 
-class Store(db.Model):
+class Store(VersionedMixin, db.Model):
     __tablename__ = 'stores'
 
     store_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -95,3 +111,82 @@ class Store(db.Model):
     def __repr__(self):
         return f'<Store {self.store_id}>'
 
+# Per-store stock totals, kept current by summaries.py in the same transaction
+# as the inventory, product or store write that changes them.
+class StoreStockSummary(db.Model):
+    __tablename__ = 'store_stock_summaries'
+
+    store_id = db.Column(db.Integer, db.ForeignKey('stores.store_id', ondelete='CASCADE'), primary_key=True)
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+    units_received = db.Column(db.BigInteger, nullable=False, default=0)
+    units_in_stock = db.Column(db.BigInteger, nullable=False, default=0)
+    units_spoilt = db.Column(db.BigInteger, nullable=False, default=0)
+    stock_value_at_cost = db.Column(db.Numeric, nullable=False, default=0)
+    stock_value_at_retail = db.Column(db.Numeric, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StoreStockSummary {self.store_id}>'
+
+# Append-only ledger of stock changes (see ledger.py). quantity is the signed
+# change to quantity_in_stock; a transfer is one row out of the source store
+# and one into the destination sharing a reference.
+class StockMovement(db.Model):
+    __tablename__ = 'stock_movements'
+
+    movement_id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    store_id = db.Column(db.Integer, db.ForeignKey('stores.store_id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id'), nullable=False)
+    kind = db.Column(db.String(12), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    occurred_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    reference = db.Column(db.String(64))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+
+    __table_args__ = (db.Index('ix_stock_movements_store_id_product_id_movement_id', 'store_id', 'product_id', 'movement_id'),)
+
+    def __repr__(self):
+        return f'<StockMovement {self.movement_id}>'
+
+# Stock on hand of a store/product pair after every movement up to and
+# including movement_id; movement_id 0 is the opening balance taken when the
+# ledger was introduced.
+class StockSnapshot(db.Model):
+    __tablename__ = 'stock_snapshots'
+
+    store_id = db.Column(db.Integer, db.ForeignKey('stores.store_id'), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id'), primary_key=True)
+    movement_id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=False)
+    quantity_in_stock = db.Column(db.Integer, nullable=False)
+    as_of = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (db.Index('ix_stock_snapshots_store_id_product_id_as_of', 'store_id', 'product_id', 'as_of'),)
+
+    def __repr__(self):
+        return f'<StockSnapshot {self.store_id}/{self.product_id}@{self.movement_id}>'
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<TableVersion {self.table_name} {self.version}>'
+
+# Left behind for every deleted versioned row so delta sync can tell clients
+# which rows to drop.
+class Tombstone(db.Model):
+    __tablename__ = 'tombstones'
+
+    tombstone_id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.BigInteger, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_tombstones_table_name_version', 'table_name', 'version', 'tombstone_id'),)
+
+    def __repr__(self):
+        return f'<Tombstone {self.table_name} {self.row_id}>'
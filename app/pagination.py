@@ -0,0 +1,143 @@
+# app/pagination.py
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from flask import request, url_for
+from sqlalchemy import inspect, select, tuple_
+from . import db
+from .errors import QueryError
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class PaginationError(QueryError):
+    pass
+
+
+class Page:
+    def __init__(self, items, next_cursor, limit):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.limit = limit
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+    return value
+
+
+def encode_cursor(sort, values):
+    payload = json.dumps([sort, [_encode_value(v) for v in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return sort, [_decode_value(v) for v in values]
+    except (ValueError, TypeError, InvalidOperation):
+        raise PaginationError('Invalid cursor')
+
+
+def primary_key(model):
+    return inspect(model).primary_key[0]
+
+
+def sortable_columns(model):
+    # Only indexed, non-nullable columns give a stable keyset order that the
+    # database can walk without scanning, so those are the only ones allowed.
+    table = model.__table__
+    indexed = {index.columns.values()[0].name for index in table.indexes}
+    return {
+        column.name: column for column in table.columns
+        if column.primary_key or (not column.nullable and (column.index or column.unique or column.name in indexed))
+    }
+
+
+def parse_limit(args):
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be a positive integer')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_sort(model, args):
+    sort = args.get('sort') or primary_key(model).name
+    name = sort.lstrip('-')
+    columns = sortable_columns(model)
+    if name not in columns:
+        raise PaginationError(f"Cannot sort by '{name}'. Sortable fields: {', '.join(sorted(columns))}")
+    return sort, columns[name], sort.startswith('-')
+
+
+def keyset_order(model, args):
+    sort, column, descending = parse_sort(model, args)
+    pk = primary_key(model)
+    keys = [column] if column is pk else [column, pk]
+    return sort, keys, descending
+
+
+def apply_keyset(stmt, keys, descending, after):
+    if after is not None:
+        if len(after) != len(keys):
+            raise PaginationError('Invalid cursor')
+        left = keys[0] if len(keys) == 1 else tuple_(*keys)
+        right = after[0] if len(keys) == 1 else tuple_(*after)
+        stmt = stmt.where(left < right if descending else left > right)
+    return stmt.order_by(*[key.desc() if descending else key.asc() for key in keys])
+
+
+def paginate(model, columns=None, criteria=(), args=None, options=()):
+    args = request.args if args is None else args
+    limit = parse_limit(args)
+    sort, keys, descending = keyset_order(model, args)
+
+    after = None
+    if args.get('cursor'):
+        cursor_sort, after = decode_cursor(args['cursor'])
+        if cursor_sort != sort:
+            raise PaginationError('Cursor does not match the requested sort order')
+
+    if columns is None:
+        stmt = select(model).options(*options)
+    else:
+        # Rows must carry the keyset columns to build the next cursor; any the
+        # caller did not ask for are appended after the requested columns.
+        selected = {column.key for column in columns}
+        stmt = select(*columns, *[key for key in keys if key.key not in selected])
+    stmt = apply_keyset(stmt.where(*criteria), keys, descending, after).limit(limit + 1)
+    result = db.session.execute(stmt)
+    items = (result.scalars() if columns is None else result).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(sort, [getattr(items[-1], key.key) for key in keys])
+    return Page(items, next_cursor, limit)
+
+
+def page_headers(page):
+    if not page.next_cursor:
+        return {}
+    args = request.args.to_dict()
+    args.update(cursor=page.next_cursor, limit=page.limit)
+    next_url = url_for(request.endpoint, _external=True, **request.view_args, **args)
+    return {'Link': f'<{next_url}>; rel="next"', 'X-Next-Cursor': page.next_cursor}
@@ -0,0 +1,87 @@
+# app/pool.py
+import threading
+import time
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': round(self.total_wait, 6),
+                'wait_seconds_max': round(self.max_wait, 6),
+                'wait_seconds_avg': round(self.total_wait / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+
+
+# QueuePool that records how long each checkout waited for a free connection
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+
+def engine_options(config):
+    # Pool sizing only applies to server databases; SQLite (used in tests)
+    # keeps SQLAlchemy's default single-connection pools.
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if not url.get_backend_name().startswith('postgresql'):
+        return {}
+    connect_args = {'application_name': config['DB_APPLICATION_NAME']}
+    if config['DB_STATEMENT_TIMEOUT_MS']:
+        connect_args['options'] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'connect_args': connect_args,
+    }
+
+
+def pool_metrics(engine):
+    pool = engine.pool
+    metrics = {'pool': type(pool).__name__, 'status': pool.status()}
+    if isinstance(pool, QueuePool):
+        metrics.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(),
+                       overflow=pool.overflow())
+    if isinstance(pool, InstrumentedQueuePool):
+        metrics.update(pool.stats.snapshot())
+    return metrics
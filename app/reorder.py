@@ -0,0 +1,122 @@
+# app/reorder.py
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import and_, func, insert, select
+from . import db
+from .ledger import RECONCILE_REFERENCE
+from .models import Inventory, StockMovement, SupplyRequest, User
+from .versioning import stamp_rows
+
+inventory = Inventory.__table__
+movements = StockMovement.__table__
+supply_requests = SupplyRequest.__table__
+
+DRAFT_STATUS = 'draft'
+# Rows that already have one of these requests are not suggested again
+OPEN_STATUSES = (DRAFT_STATUS, 'pending')
+
+
+class ReorderError(RuntimeError):
+    pass
+
+
+class ReorderPolicy:
+    def __init__(self, lead_time_days=7, safety_days=3, review_days=14, history_days=30):
+        if history_days <= 0:
+            raise ReorderError('history_days must be positive')
+        self.lead_time_days = lead_time_days
+        self.safety_days = safety_days
+        self.review_days = review_days
+        self.history_days = history_days
+
+
+class ReorderReport:
+    def __init__(self, scanned, suggestions):
+        self.scanned = scanned
+        self.suggestions = suggestions
+
+
+# All inventory rows as int64 columns: ids, received, in stock, spoilt
+def load_stock():
+    rows = db.session.execute(select(inventory.c.inventory_id, inventory.c.quantity_received,
+                                     inventory.c.quantity_in_stock, inventory.c.quantity_spoilt)
+                              .order_by(inventory.c.inventory_id)).all()
+    return np.array(rows, dtype=np.int64).reshape(-1, 4).T
+
+
+# Units sold per inventory row over the history window according to the
+# stock movement ledger, aligned with `ids` (sorted). Only movements inside
+# the window are summed (through the occurred_at index); whether a row is
+# tracked at all is an EXISTS probe on the pair index. Rows whose pair has no
+# movements but the adjustments that reconcile direct writes are not tracked
+# by the ledger and get NaN.
+def load_sales(ids, policy):
+    since = datetime.utcnow() - timedelta(days=policy.history_days)
+    sold = select(movements.c.store_id, movements.c.product_id, func.sum(-movements.c.quantity).label('sold')) \
+        .where(movements.c.kind == 'sale', movements.c.occurred_at >= since) \
+        .group_by(movements.c.store_id, movements.c.product_id).subquery()
+    tracked = select(movements.c.movement_id).where(
+        movements.c.store_id == inventory.c.store_id, movements.c.product_id == inventory.c.product_id,
+        movements.c.reference.is_distinct_from(RECONCILE_REFERENCE)).exists()
+    rows = db.session.execute(
+        select(inventory.c.inventory_id, func.coalesce(sold.c.sold, 0))
+        .outerjoin(sold, and_(sold.c.store_id == inventory.c.store_id, sold.c.product_id == inventory.c.product_id))
+        .where(tracked)
+    ).all()
+    sales = np.full(len(ids), np.nan)
+    if rows and len(ids):
+        found = np.array(rows, dtype=np.int64).reshape(-1, 2).T
+        # Rows inserted after load_stock read `ids` are not in it; drop them
+        # rather than writing their sales onto a neighbour
+        positions = np.minimum(np.searchsorted(ids, found[0]), len(ids) - 1)
+        matched = ids[positions] == found[0]
+        sales[positions[matched]] = found[1][matched]
+    return sales
+
+
+# Average units consumed per day: recorded sales for rows the ledger tracks,
+# even when there were none in the history window; otherwise units received
+# but neither in stock nor spoilt, spread over the same window.
+def daily_demand(received, in_stock, spoilt, policy, sales=None):
+    consumed = np.clip(received - in_stock - spoilt, 0, None)
+    if sales is not None:
+        consumed = np.where(np.isnan(sales), consumed, sales)
+    return consumed / policy.history_days
+
+
+# Reorder when stock would not cover demand over the lead time plus the
+# safety days; order enough to last until the next review after that.
+def reorder_quantities(in_stock, demand, policy):
+    reorder_point = np.ceil(demand * (policy.lead_time_days + policy.safety_days))
+    order_up_to = reorder_point + np.ceil(demand * policy.review_days)
+    needed = (demand > 0) & (in_stock <= reorder_point)
+    return np.where(needed, order_up_to - in_stock, 0).astype(np.int64)
+
+
+# Computes reorder suggestions for every inventory row in one pass over
+# columnar arrays and inserts them as draft supply requests with a single
+# executemany. Rows that already have an open request are skipped.
+def suggest_reorders(user_id, policy=None, dry_run=False):
+    if db.session.get(User, user_id) is None:
+        raise ReorderError(f'User {user_id} does not exist')
+    policy = policy or ReorderPolicy()
+
+    ids, received, in_stock, spoilt = load_stock()
+    demand = daily_demand(received, in_stock, spoilt, policy, load_sales(ids, policy))
+    quantities = reorder_quantities(in_stock, demand, policy)
+
+    open_ids = np.fromiter(db.session.execute(select(supply_requests.c.inventory_id).distinct()
+                                              .where(supply_requests.c.status.in_(OPEN_STATUSES))).scalars(),
+                           dtype=np.int64)
+    selected = (quantities > 0) & ~np.isin(ids, open_ids)
+
+    now = datetime.utcnow()
+    suggestions = [
+        {'inventory_id': inventory_id, 'user_id': user_id, 'status': DRAFT_STATUS, 'quantity': quantity,
+         'request_date': now}
+        for inventory_id, quantity in zip(ids[selected].tolist(), quantities[selected].tolist())
+    ]
+    if suggestions and not dry_run:
+        db.session.execute(insert(supply_requests), stamp_rows(SupplyRequest, suggestions))
+        db.session.commit()
+    return ReorderReport(len(ids), suggestions)
@@ -0,0 +1,125 @@
+# app/replicas.py
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, make_url, text
+
+READ_METHODS = ('GET', 'HEAD')
+PRIMARY_COOKIE = 'read_primary_until'
+
+# Zero while the replica has replayed everything it received; otherwise the
+# age of the last replayed transaction.
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+_round_robin = itertools.count()
+_lag_lock = threading.Lock()
+_lag_cache = {}
+
+
+# Sends statements to the replica picked for the request, if any. Flushes
+# always go to the primary, so a GET can never write to a replica.
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context():
+            replica = g.get('db_replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_engines(app):
+    return app.extensions.get('replicas', [])
+
+
+def _check_lag(engine):
+    if engine.dialect.name != 'postgresql':
+        return 0.0
+    timeout_ms = int(current_app.config['REPLICA_CONNECT_TIMEOUT_SECONDS'] * 1000)
+    try:
+        with engine.connect() as connection:
+            connection.exec_driver_sql(f'SET LOCAL statement_timeout = {timeout_ms}')
+            return float(connection.execute(LAG_QUERY).scalar() or 0)
+    except Exception:
+        return float('inf')  # unreachable replicas are skipped until the next check
+
+
+# Lag per replica, rechecked at most every REPLICA_LAG_CHECK_SECONDS. The
+# request that finds the result expired does the check; concurrent requests
+# keep using the previous result (an unchecked replica counts as lagging)
+# rather than all waiting on the same slow replica.
+def replica_lag(engine):
+    interval = current_app.config['REPLICA_LAG_CHECK_SECONDS']
+    now = time.monotonic()
+    with _lag_lock:
+        checked_at, lag = _lag_cache.get(engine, (None, float('inf')))
+        if checked_at is not None and now - checked_at < interval:
+            return lag
+        _lag_cache[engine] = (now, lag)
+    lag = _check_lag(engine)
+    with _lag_lock:
+        _lag_cache[engine] = (now, lag)
+    return lag
+
+
+def choose_replica():
+    engines = replica_engines(current_app)
+    if not engines:
+        return None
+    max_lag = current_app.config['REPLICA_MAX_LAG_SECONDS']
+    start = next(_round_robin)
+    for offset in range(len(engines)):
+        engine = engines[(start + offset) % len(engines)]
+        if replica_lag(engine) <= max_lag:
+            return engine
+    return None  # every replica is behind; fall back to the primary
+
+
+def wants_primary():
+    if request.headers.get('X-Consistency', '').lower() == 'strong':
+        return True
+    until = request.cookies.get(PRIMARY_COOKIE)
+    try:
+        return until is not None and datetime.fromisoformat(until) > datetime.now(timezone.utc)
+    except ValueError:
+        return False
+
+
+def _route_request():
+    if request.method in READ_METHODS and not wants_primary():
+        g.db_replica = choose_replica()
+
+
+def _pin_after_write(response):
+    # A client that just wrote keeps reading from the primary until replicas
+    # have had time to catch up, so it always sees its own writes.
+    if request.method not in READ_METHODS and response.status_code < 400 and replica_engines(current_app):
+        seconds = current_app.config['READ_AFTER_WRITE_SECONDS']
+        until = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+        response.set_cookie(PRIMARY_COOKIE, until.isoformat(), max_age=seconds, httponly=True, samesite='Lax')
+    return response
+
+
+def _replica_engine(url, options, connect_timeout):
+    if make_url(url).get_backend_name().startswith('postgresql'):
+        # A dead replica must fail fast, not hold every read until the OS
+        # gives up on the TCP connection
+        connect_args = dict(options.get('connect_args', {}), connect_timeout=connect_timeout)
+        options = dict(options, connect_args=connect_args)
+    return create_engine(url, **options)
+
+
+# Replica engines are kept out of SQLALCHEMY_BINDS so create_all, drop_all
+# and migrations never touch them; they share the primary's pool settings.
+def init_replicas(app):
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    timeout = max(1, int(app.config['REPLICA_CONNECT_TIMEOUT_SECONDS']))
+    app.extensions['replicas'] = [_replica_engine(url, options, timeout)
+                                  for url in app.config.get('DATABASE_REPLICA_URLS', ())]
+    app.before_request(_route_request)
+    app.after_request(_pin_after_write)
@@ -0,0 +1,103 @@
+# app/reports.py
+from decimal import Decimal
+from flask import jsonify, request
+from sqlalchemy import func, select
+from . import db
+from .errors import QueryError
+from .filters import filter_criteria
+from .models import Inventory, Product, Store
+from .pagination import Page, PaginationError, apply_keyset, decode_cursor, encode_cursor, page_headers, parse_limit
+
+inventory = Inventory.__table__
+products = Product.__table__
+stores = Store.__table__
+
+# group_by value -> (key column, descriptive columns)
+GROUPINGS = {
+    'store': (stores.c.store_id, (stores.c.store_name, stores.c.location)),
+    'product': (products.c.product_id, (products.c.sku, products.c.product_name)),
+}
+SORTABLE_METRICS = ('units_in_stock', 'units_spoilt', 'stock_value_at_cost', 'stock_value_at_retail', 'margin',
+                    'spoilage_loss')
+CENT = Decimal('0.01')
+
+
+class ReportError(QueryError):
+    pass
+
+
+def parse_group_by(args):
+    names = [name.strip() for name in args.get('group_by', 'store').split(',') if name.strip()]
+    unknown = [name for name in names if name not in GROUPINGS]
+    if unknown or not names:
+        raise ReportError(f"Cannot group by '{','.join(unknown)}'. Use store, product or store,product")
+    return [name for name in GROUPINGS if name in names]
+
+
+# One grouped aggregate over inventory joined to products (and stores when
+# grouping by store); filters on inventory columns apply before grouping.
+def valuation_query(groups, criteria=()):
+    in_stock = inventory.c.quantity_in_stock
+    buying_price = func.coalesce(products.c.buying_price, 0)
+    selling_price = func.coalesce(products.c.selling_price, 0)
+    cost = func.sum(in_stock * buying_price)
+    retail = func.sum(in_stock * selling_price)
+
+    source = inventory.join(products, products.c.product_id == inventory.c.product_id)
+    if 'store' in groups:
+        source = source.join(stores, stores.c.store_id == inventory.c.store_id)
+    keys = [GROUPINGS[name][0] for name in groups]
+    labels = [column for name in groups for column in GROUPINGS[name][1]]
+    return select(
+        *keys, *labels,
+        func.count().label('line_count'),
+        func.sum(in_stock).label('units_in_stock'),
+        func.sum(inventory.c.quantity_spoilt).label('units_spoilt'),
+        cost.label('stock_value_at_cost'),
+        retail.label('stock_value_at_retail'),
+        (retail - cost).label('margin'),
+        func.sum(inventory.c.quantity_spoilt * buying_price).label('spoilage_loss'),
+    ).select_from(source).where(*criteria).group_by(*keys, *labels).subquery('valuation')
+
+
+def _report_row(row):
+    item = dict(row._mapping)
+    retail = item['stock_value_at_retail']
+    # Margin as a percentage of retail value; null when nothing is in stock
+    item['margin_pct'] = (Decimal(item['margin']) * 100 / Decimal(retail)).quantize(CENT) if retail else None
+    return item
+
+
+def valuation_page(args):
+    groups = parse_group_by(args)
+    report = valuation_query(groups, filter_criteria(Inventory, args))
+    keys = [report.c[GROUPINGS[name][0].name] for name in groups]
+
+    sort = args.get('sort') or keys[0].name
+    name = sort.lstrip('-')
+    if name not in SORTABLE_METRICS and name not in [key.name for key in keys]:
+        raise PaginationError(f"Cannot sort by '{name}'. Sortable fields: {', '.join(SORTABLE_METRICS)} or the group keys")
+    descending = sort.startswith('-')
+    if name in SORTABLE_METRICS:
+        keys = [report.c[name], *keys]
+    elif name != keys[0].name:
+        keys = [report.c[name], *[key for key in keys if key.name != name]]
+
+    after = None
+    if args.get('cursor'):
+        cursor_sort, after = decode_cursor(args['cursor'])
+        if cursor_sort != f"{sort}:{','.join(groups)}":
+            raise PaginationError('Cursor does not match the requested sort order or grouping')
+
+    limit = parse_limit(args)
+    rows = db.session.execute(apply_keyset(select(report), keys, descending, after).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(f"{sort}:{','.join(groups)}", [getattr(rows[-1], key.name) for key in keys])
+    return Page([_report_row(row) for row in rows], next_cursor, limit)
+
+
+def valuation_response():
+    page = valuation_page(request.args)
+    return jsonify(page.items), 200, page_headers(page)
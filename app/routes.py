@@ -1,28 +1,50 @@
 # app/routes.py
+import io
 from flask import Blueprint, jsonify, request
-from .schemas import UserSchema, InvitationSchema, ProductSchema, InventorySchema, SupplyRequestSchema, PaymentSchema, StoreSchema
+from .schemas import (user_schema, users_schema, invitation_schema, invitations_schema, product_schema, products_schema,
+                      inventory_schema, inventories_schema, supply_request_schema, supply_requests_schema,
+                      payment_schema, payments_schema, product_load_schema, inventory_load_schema,
+                      store_schema, stores_schema, store_stock_summaries_schema, stock_movements_schema,
+                      supply_request_load_schema, payment_load_schema)
 from datetime import datetime
 from . import db  # Assuming db is your SQLAlchemy object
-from .models import User, Invitation, Product, Inventory, SupplyRequest, Payment, Store
+from .models import User, Invitation, Product, Inventory, SupplyRequest, Payment, Store, StoreStockSummary, StockMovement
+from .bulk import bulk_response, upsert_response
+from .conditional import conditional
+from .exporting import export_response
+from .importing import import_inventory
+from .ledger import InsufficientStock, movement_entries, record_movements, stock_levels
+from .listing import fetch_detail, list_response
+from .errors import QueryError
+from .pagination import parse_limit
+from .pool import pool_metrics
+from .reports import valuation_response
+from .cache import cached, get_cache
+from .sync import sync_changes
 
 # Define a Blueprint
 app_bp = Blueprint('app', __name__)
 
 # Route to get all users
 @app_bp.route('/users', methods=['GET'])
+@conditional(User)
 def get_users():
     try:
-        users = User.query.all()
-        return jsonify([UserSchema().dump(user) for user in users]), 200
+        return list_response(User, users_schema)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 @app_bp.route('/users/<int:id>', methods=['GET'])
+@conditional(User)
 def get_user(id):
     try:
-        user = User.query.get(id)
-        if not user:
+        user = fetch_detail(User, user_schema, id)
+        if user is None:
             return jsonify({'error': 'User not found'}), 404
-        return jsonify(UserSchema().dump(user)), 200
+        return jsonify(user), 200
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -40,7 +62,7 @@ def add_user():
         db.session.add(new_user)
         db.session.commit()
 
-        return jsonify({'message': 'User added successfully', 'user': UserSchema().dump(new_user)}), 201
+        return jsonify({'message': 'User added successfully', 'user': user_schema.dump(new_user)}), 201
     except Exception as e:
         db.session.rollback()  # Rollback the session in case of an exception
         return jsonify({'error': str(e)}), 500
@@ -59,7 +81,7 @@ def update_user(id):
         user.is_active = data.get('is_active', user.is_active)
 
         db.session.commit()
-        return jsonify({'message': 'User updated successfully', 'user': UserSchema().dump(user)}), 200
+        return jsonify({'message': 'User updated successfully', 'user': user_schema.dump(user)}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -79,19 +101,24 @@ def delete_user(id):
 
 # Route to get all invitations
 @app_bp.route('/invitations', methods=['GET'])
+@conditional(Invitation)
 def get_invitations():
     try:
-        invitations = Invitation.query.all()
-        return jsonify([InvitationSchema().dump(invitation) for invitation in invitations]), 200
+        return list_response(Invitation, invitations_schema)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 @app_bp.route('/invitations/<int:id>', methods=['GET'])
+@conditional(Invitation)
 def get_invitation(id):
     try:
-        invitation = Invitation.query.get(id)
-        if not invitation:
+        invitation = fetch_detail(Invitation, invitation_schema, id)
+        if invitation is None:
             return jsonify({'error': 'Invitation not found'}), 404
-        return jsonify(InvitationSchema().dump(invitation)), 200
+        return jsonify(invitation), 200
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 @app_bp.route('/invitations/<int:id>', methods=['PUT'])
@@ -108,7 +135,7 @@ def update_invitation(id):
         invitation.is_used = data.get('is_used', invitation.is_used)
 
         db.session.commit()
-        return jsonify({'message': 'Invitation updated successfully', 'invitation': InvitationSchema().dump(invitation)}), 200
+        return jsonify({'message': 'Invitation updated successfully', 'invitation': invitation_schema.dump(invitation)}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -127,7 +154,7 @@ def add_invitation():
         db.session.add(new_invitation)
         db.session.commit()
 
-        return jsonify({'message': 'Invitation added successfully', 'invitation': InvitationSchema().dump(new_invitation)}), 201
+        return jsonify({'message': 'Invitation added successfully', 'invitation': invitation_schema.dump(new_invitation)}), 201
     except Exception as e:
         db.session.rollback()  # Rollback the session in case of an exception
         return jsonify({'error': str(e)}), 500
@@ -147,10 +174,13 @@ def delete_invitation(id):
 
 # Route to get all products
 @app_bp.route('/products', methods=['GET'])
+@cached(Product)
+@conditional(Product)
 def get_products():
     try:
-        products = Product.query.all()
-        return jsonify([ProductSchema().dump(product) for product in products]), 200
+        return list_response(Product, products_schema)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -163,23 +193,51 @@ def add_product():
         buying_price = data['buying_price']
         selling_price = data['selling_price']
 
-        new_product = Product(product_name=product_name, buying_price=buying_price, selling_price=selling_price)
+        new_product = Product(sku=data.get('sku'), product_name=product_name, buying_price=buying_price, selling_price=selling_price)
         db.session.add(new_product)
         db.session.commit()
 
-        return jsonify({'message': 'Product added successfully', 'product': ProductSchema().dump(new_product)}), 201
+        return jsonify({'message': 'Product added successfully', 'product': product_schema.dump(new_product)}), 201
     except Exception as e:
         db.session.rollback()  # Rollback the session in case of an exception
         return jsonify({'error': str(e)}), 500
+# Route to add many products in one transaction
+@app_bp.route('/products/bulk', methods=['POST'])
+def add_products_bulk():
+    try:
+        body, status = bulk_response(Product, product_load_schema, request.json)
+        return jsonify(body), status
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+# Route to insert or update products by their natural key
+@app_bp.route('/products/upsert', methods=['POST'])
+def upsert_products():
+    try:
+        body, status = upsert_response(Product, product_load_schema, request.json, ('sku',))
+        return jsonify(body), status
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Route to get a specific product by ID
 @app_bp.route('/products/<int:id>', methods=['GET'])
+@cached(Product)
+@conditional(Product)
 def get_product(id):
     try:
-        product = Product.query.get(id)
-        if not product:
+        product = fetch_detail(Product, product_schema, id)
+        if product is None:
             return jsonify({'error': 'Product not found'}), 404
 
-        return jsonify(ProductSchema().dump(product)), 200
+        return jsonify(product), 200
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -208,6 +266,8 @@ def update_product(id):
             return jsonify({'error': 'Product not found'}), 404
 
         # Update fields if provided in the request
+        if 'sku' in data:
+            product.sku = data['sku']
         if 'product_name' in data:
             product.product_name = data['product_name']
         if 'buying_price' in data:
@@ -216,7 +276,7 @@ def update_product(id):
             product.selling_price = data['selling_price']
 
         db.session.commit()
-        return jsonify({'message': 'Product updated successfully', 'product': ProductSchema().dump(product)}), 200
+        return jsonify({'message': 'Product updated successfully', 'product': product_schema.dump(product)}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -232,12 +292,53 @@ def update_product(id):
 
 
 
+# Route to get all stores
+@app_bp.route('/stores', methods=['GET'])
+@cached(Store)
+@conditional(Store)
+def get_stores():
+    try:
+        return list_response(Store, stores_schema)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Route to get stock totals per store, read from the maintained summary table
+@app_bp.route('/stores/stock-summary', methods=['GET'])
+@conditional(StoreStockSummary, Inventory, Product, Store)
+def get_store_stock_summaries():
+    try:
+        return list_response(StoreStockSummary, store_stock_summaries_schema)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Route to get a specific store by ID
+@app_bp.route('/stores/<int:id>', methods=['GET'])
+@cached(Store)
+@conditional(Store)
+def get_store(id):
+    try:
+        store = fetch_detail(Store, store_schema, id)
+        if store is None:
+            return jsonify({'error': 'Store not found'}), 404
+
+        return jsonify(store), 200
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Route to get all inventories
 @app_bp.route('/inventories', methods=['GET'])
+@conditional(Inventory)
 def get_inventories():
     try:
-        inventories = Inventory.query.all()
-        return jsonify([InventorySchema().dump(inventory) for inventory in inventories]), 200
+        return list_response(Inventory, inventories_schema)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -259,17 +360,78 @@ def add_inventory():
         db.session.add(new_inventory)
         db.session.commit()
 
-        return jsonify({'message': 'Inventory added successfully', 'inventory': InventorySchema().dump(new_inventory)}), 201
+        return jsonify({'message': 'Inventory added successfully', 'inventory': inventory_schema.dump(new_inventory)}), 201
     except Exception as e:
         db.session.rollback()  # Rollback the session in case of an exception
         return jsonify({'error': str(e)}), 500
 
+# Route to add many inventory records in one transaction
+@app_bp.route('/inventories/bulk', methods=['POST'])
+def add_inventories_bulk():
+    try:
+        body, status = bulk_response(Inventory, inventory_load_schema, request.json)
+        return jsonify(body), status
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+# Route to insert or update inventory records by their natural key
+@app_bp.route('/inventories/upsert', methods=['POST'])
+def upsert_inventories():
+    try:
+        body, status = upsert_response(Inventory, inventory_load_schema, request.json, ('store_id', 'product_id'))
+        return jsonify(body), status
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+# Route to export inventory as CSV or XLSX
+@app_bp.route('/inventories/export', methods=['GET'])
+def export_inventories():
+    try:
+        return export_response(Inventory, inventories_schema, 'inventory')
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Route to import inventory rows from a CSV or TSV upload
+@app_bp.route('/inventories/import', methods=['POST'])
+def import_inventories():
+    try:
+        tab_separated = request.mimetype == 'text/tab-separated-values' or request.args.get('delimiter') == 'tab'
+        text_stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8', newline='')
+        report = import_inventory(text_stream, '\t' if tab_separated else ',')
+        return jsonify(report.to_dict()), 200
+    except QueryError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Route to get all supply requests
 @app_bp.route('/supply-requests', methods=['GET'])
+@conditional(SupplyRequest)
 def get_supply_requests():
     try:
-        supply_requests = SupplyRequest.query.all()
-        return jsonify([SupplyRequestSchema().dump(request) for request in supply_requests]), 200
+        return list_response(SupplyRequest, supply_requests_schema)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Route to export supply requests as CSV or XLSX
+@app_bp.route('/supply-requests/export', methods=['GET'])
+def export_supply_requests():
+    try:
+        return export_response(SupplyRequest, supply_requests_schema, 'supply_requests')
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -286,19 +448,34 @@ def add_supply_request():
         db.session.add(new_request)
         db.session.commit()
 
-        return jsonify({'message': 'Supply request added successfully', 'request': SupplyRequestSchema().dump(new_request)}), 201
+        return jsonify({'message': 'Supply request added successfully', 'request': supply_request_schema.dump(new_request)}), 201
     except Exception as e:
         db.session.rollback()  # Rollback the session in case of an exception
         return jsonify({'error': str(e)}), 500
+# Route to add many supply requests in one transaction
+@app_bp.route('/supply-requests/bulk', methods=['POST'])
+def add_supply_requests_bulk():
+    try:
+        body, status = bulk_response(SupplyRequest, supply_request_load_schema, request.json)
+        return jsonify(body), status
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Route to get a specific supply request by ID
 @app_bp.route('/supply-requests/<int:id>', methods=['GET'])
+@conditional(SupplyRequest)
 def get_supply_request(id):
     try:
-        supply_request = SupplyRequest.query.get(id)
-        if not supply_request:
+        supply_request = fetch_detail(SupplyRequest, supply_request_schema, id)
+        if supply_request is None:
             return jsonify({'error': 'Supply request not found'}), 404
 
-        return jsonify(SupplyRequestSchema().dump(supply_request)), 200
+        return jsonify(supply_request), 200
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -335,16 +512,28 @@ def update_supply_request(id):
             supply_request.status = data['status']
 
         db.session.commit()
-        return jsonify({'message': 'Supply request updated successfully', 'supply_request': SupplyRequestSchema().dump(supply_request)}), 200
+        return jsonify({'message': 'Supply request updated successfully', 'supply_request': supply_request_schema.dump(supply_request)}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 # Route to get all payments
 @app_bp.route('/payments', methods=['GET'])
+@conditional(Payment)
 def get_payments():
     try:
-        payments = Payment.query.all()
-        return jsonify([PaymentSchema().dump(payment) for payment in payments]), 200
+        return list_response(Payment, payments_schema)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Route to export payments as CSV or XLSX
+@app_bp.route('/payments/export', methods=['GET'])
+def export_payments():
+    try:
+        return export_response(Payment, payments_schema, 'payments')
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -365,19 +554,34 @@ def add_payment():
         db.session.add(new_payment)
         db.session.commit()
 
-        return jsonify({'message': 'Payment added successfully', 'payment': PaymentSchema().dump(new_payment)}), 201
+        return jsonify({'message': 'Payment added successfully', 'payment': payment_schema.dump(new_payment)}), 201
     except Exception as e:
         db.session.rollback()  # Rollback the session in case of an exception
         return jsonify({'error': str(e)}), 500
+# Route to add many payments in one transaction
+@app_bp.route('/payments/bulk', methods=['POST'])
+def add_payments_bulk():
+    try:
+        body, status = bulk_response(Payment, payment_load_schema, request.json)
+        return jsonify(body), status
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Route to get a specific payment by ID
 @app_bp.route('/payments/<int:id>', methods=['GET'])
+@conditional(Payment)
 def get_payment(id):
     try:
-        payment = Payment.query.get(id)
-        if not payment:
+        payment = fetch_detail(Payment, payment_schema, id)
+        if payment is None:
             return jsonify({'error': 'Payment not found'}), 404
 
-        return jsonify(PaymentSchema().dump(payment)), 200
+        return jsonify(payment), 200
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -418,7 +622,86 @@ def update_payment(id):
             payment.payment_status = data['payment_status']
 
         db.session.commit()
-        return jsonify({'message': 'Payment updated successfully', 'payment': PaymentSchema().dump(payment)}), 200
+        return jsonify({'message': 'Payment updated successfully', 'payment': payment_schema.dump(payment)}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+# Route to get products, stores and inventory changed since a sync checkpoint
+@app_bp.route('/sync', methods=['GET'])
+def sync():
+    try:
+        return jsonify(sync_changes(request.args.get('checkpoint'), parse_limit(request.args))), 200
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Route to record stock movements (an object, or an array applied atomically)
+@app_bp.route('/stock-movements', methods=['POST'])
+def add_stock_movements():
+    try:
+        data = request.json
+        items = data if isinstance(data, list) else [data]
+        entries = [entry for item in items for entry in movement_entries(item)]
+        ids = record_movements(entries)
+        db.session.commit()
+        return jsonify({'message': 'Stock movements recorded', 'movement_ids': ids}), 201
+    except InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except QueryError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+# Route to get the stock movement ledger
+@app_bp.route('/stock-movements', methods=['GET'])
+@conditional(StockMovement)
+def get_stock_movements():
+    try:
+        return list_response(StockMovement, stock_movements_schema)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Route to get a store's stock per product, now or as of ?at=<ISO 8601 time>
+@app_bp.route('/stores/<int:id>/stock', methods=['GET'])
+@conditional(StockMovement, Inventory)
+def get_store_stock(id):
+    try:
+        return jsonify(stock_levels(id, request.args)), 200
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Route to get stock valuation, margin and spoilage loss grouped by
+# ?group_by=store, product or store,product
+@app_bp.route('/reports/valuation', methods=['GET'])
+@cached(Inventory, Product, Store)
+@conditional(Inventory, Product, Store)
+def get_valuation_report():
+    try:
+        return valuation_response()
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Route to get connection pool usage for this worker process
+@app_bp.route('/metrics/pool', methods=['GET'])
+def get_pool_metrics():
+    try:
+        return jsonify(pool_metrics(db.engine)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Route to get read-through cache counters for this worker process
+@app_bp.route('/metrics/cache', methods=['GET'])
+def get_cache_metrics():
+    cache = get_cache()
+    return jsonify(cache.stats() if cache is not None else {'enabled': False}), 200
@@ -1,5 +1,5 @@
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
-from .models import User, Invitation, Product, Inventory, SupplyRequest, Payment, Store
+from .models import User, Invitation, Product, Inventory, SupplyRequest, Payment, Store, StoreStockSummary, StockMovement
 from flask_marshmallow import Marshmallow
 
 ma = Marshmallow()
@@ -23,11 +23,13 @@ class InventorySchema(SQLAlchemyAutoSchema):
     class Meta:
         model = Inventory
         load_instance = True
+        include_fk = True
 
 class SupplyRequestSchema(SQLAlchemyAutoSchema):
     class Meta:
         model = SupplyRequest
         load_instance = True
+        include_fk = True
 
 class PaymentSchema(SQLAlchemyAutoSchema):
     class Meta:
@@ -39,7 +41,41 @@ class StoreSchema(SQLAlchemyAutoSchema):
         model = Store
         load_instance = True
 
+class StockMovementSchema(SQLAlchemyAutoSchema):
+    class Meta:
+        model = StockMovement
+        include_fk = True
+
+class StoreStockSummarySchema(SQLAlchemyAutoSchema):
+    class Meta:
+        model = StoreStockSummary
+        include_fk = True
+
+# Schemas hold no per-dump state, so one instance of each is shared by all requests
+user_schema = UserSchema()
+users_schema = UserSchema(many=True)
+invitation_schema = InvitationSchema()
+invitations_schema = InvitationSchema(many=True)
+product_schema = ProductSchema()
+products_schema = ProductSchema(many=True)
+inventory_schema = InventorySchema()
+inventories_schema = InventorySchema(many=True)
+supply_request_schema = SupplyRequestSchema()
+supply_requests_schema = SupplyRequestSchema(many=True)
+payment_schema = PaymentSchema()
+payments_schema = PaymentSchema(many=True)
+store_schema = StoreSchema()
+stores_schema = StoreSchema(many=True)
+store_stock_summaries_schema = StoreStockSummarySchema(many=True)
+stock_movements_schema = StockMovementSchema(many=True)
 
+# Load plain dicts (not instances) for set-based inserts; keys, row versions
+# and timestamps are assigned by the database and versioning.py
+SERVER_FIELDS = ('updated_at', 'version')
+product_load_schema = ProductSchema(load_instance=False, exclude=('product_id',) + SERVER_FIELDS)
+inventory_load_schema = InventorySchema(load_instance=False, exclude=('inventory_id',) + SERVER_FIELDS)
+supply_request_load_schema = SupplyRequestSchema(load_instance=False, exclude=('request_id', 'request_date') + SERVER_FIELDS)
+payment_load_schema = PaymentSchema(load_instance=False, exclude=('user_id',) + SERVER_FIELDS)
 
 
 def init_ma(app):
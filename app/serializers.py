@@ -0,0 +1,87 @@
+# app/serializers.py
+from functools import lru_cache
+from operator import attrgetter
+from marshmallow import fields
+from .errors import QueryError
+
+# Field types whose database values are already JSON-ready and come out of
+# marshmallow unchanged, so the compiled serializer can pass them through.
+PASSTHROUGH_FIELDS = (fields.Integer, fields.String, fields.Boolean, fields.Float, fields.Decimal)
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _converter(name, field):
+    if isinstance(field, fields.DateTime) and field.format in (None, 'iso'):
+        return _isoformat
+    if isinstance(field, fields.Date) and field.format in (None, 'iso'):
+        return _isoformat
+    if isinstance(field, PASSTHROUGH_FIELDS) and not getattr(field, 'places', None) and not getattr(field, 'as_string', False):
+        return None
+    return lambda value: field._serialize(value, name, None)
+
+
+class RowSerializer:
+    def __init__(self, schema):
+        model = schema.opts.model
+        self.keys = []
+        self.attributes = []
+        converters = []
+        for name, field in schema.dump_fields.items():
+            attribute = field.attribute or name
+            self.keys.append(field.data_key or name)
+            self.attributes.append(attribute)
+            convert = _converter(name, field)
+            if convert is not None:
+                converters.append((field.data_key or name, convert))
+        self.columns = [getattr(model, attribute) for attribute in self.attributes]
+        self.converters = tuple(converters)
+        self._getter = attrgetter(*self.attributes)
+
+    def __call__(self, row):
+        data = dict(zip(self.keys, row))
+        for key, convert in self.converters:
+            value = data[key]
+            if value is not None:
+                data[key] = convert(value)
+        return data
+
+    def dump_rows(self, rows):
+        return [self(row) for row in rows]
+
+    def dump_object(self, obj):
+        values = self._getter(obj)
+        return self(values if len(self.attributes) > 1 else (values,))
+
+    def dump_objects(self, objs):
+        return [self.dump_object(obj) for obj in objs]
+
+
+class FieldsError(QueryError):
+    pass
+
+
+@lru_cache(maxsize=256)
+def compile_serializer(schema):
+    return RowSerializer(schema)
+
+
+@lru_cache(maxsize=256)
+def _projected_schema(schema_cls, only, many):
+    return schema_cls(only=only, many=many)
+
+
+# Narrow a shared schema to the comma-separated ?fields= list, if one was
+# given, keeping the client's order (it is also the CSV column order)
+def project_schema(schema, args):
+    requested = args.get('fields')
+    if not requested:
+        return schema
+    only = tuple(dict.fromkeys(name.strip() for name in requested.split(',') if name.strip()))
+    unknown = [name for name in only if name not in schema.dump_fields]
+    if unknown or not only:
+        raise FieldsError(f"Unknown fields: {', '.join(unknown)}. Available fields: {', '.join(schema.dump_fields)}")
+    return _projected_schema(type(schema), only, schema.many)
+
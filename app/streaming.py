@@ -0,0 +1,40 @@
+# app/streaming.py
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import select
+from . import db
+from .pagination import primary_key
+from .serializers import compile_serializer
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+STREAM_BATCH_SIZE = 1000
+
+
+def wants_stream():
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def iter_batches(model, schema, criteria=(), options=()):
+    # yield_per makes the driver use a server-side cursor, so only one batch
+    # of rows is held in the worker at a time; each batch is yielded as a
+    # list of serialized dicts for the caller to write out as one chunk.
+    fast = current_app.config.get('FAST_SERIALIZATION') and not options
+    if fast:
+        serializer = compile_serializer(schema)
+        stmt, dump = select(*serializer.columns), serializer.dump_rows
+    else:
+        stmt, dump = select(model).options(*options), schema.dump
+    stmt = stmt.where(*criteria).order_by(primary_key(model)).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    result = db.session.execute(stmt)
+    for batch in (result if fast else result.scalars()).partitions():
+        yield dump(batch)
+
+
+def ndjson_response(model, schema, criteria=(), options=()):
+    def generate():
+        for batch in iter_batches(model, schema, criteria, options):
+            yield ''.join(current_app.json.dumps(item) + '\n' for item in batch)
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
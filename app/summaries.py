@@ -0,0 +1,270 @@
+# app/summaries.py
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import bindparam, event, func, inspect, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from . import db
+from .models import Inventory, Product, Store, StoreStockSummary
+
+summaries = StoreStockSummary.__table__
+inventory = Inventory.__table__
+products = Product.__table__
+stores = Store.__table__
+
+STOCK_FIELDS = ('store_id', 'product_id', 'quantity_received', 'quantity_in_stock', 'quantity_spoilt')
+PRICE_FIELDS = ('buying_price', 'selling_price')
+TOTAL_COLUMNS = ('product_count', 'units_received', 'units_in_stock', 'units_spoilt',
+                 'stock_value_at_cost', 'stock_value_at_retail')
+
+
+def _totals(store_ids):
+    in_stock = inventory.c.quantity_in_stock
+    return select(
+        inventory.c.store_id,
+        func.count().label('product_count'),
+        func.sum(inventory.c.quantity_received).label('units_received'),
+        func.sum(in_stock).label('units_in_stock'),
+        func.sum(inventory.c.quantity_spoilt).label('units_spoilt'),
+        func.sum(in_stock * func.coalesce(products.c.buying_price, 0)).label('stock_value_at_cost'),
+        func.sum(in_stock * func.coalesce(products.c.selling_price, 0)).label('stock_value_at_retail'),
+    ).join(products, products.c.product_id == inventory.c.product_id) \
+        .where(inventory.c.store_id.in_(store_ids)).group_by(inventory.c.store_id)
+
+
+def _ensure_rows(connection, store_ids):
+    existing = select(stores.c.store_id).where(stores.c.store_id.in_(store_ids))
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = dialect_insert(summaries).from_select(['store_id'], existing).on_conflict_do_nothing(index_elements=['store_id'])
+    else:
+        stmt = insert(summaries).from_select(
+            ['store_id'], existing.where(~select(summaries.c.store_id).where(summaries.c.store_id == stores.c.store_id).exists()))
+    connection.execute(stmt)
+
+
+# Recomputes the summary rows of the given stores from scratch inside the
+# caller's transaction. Writes keep the rows current with deltas (see
+# apply_deltas); this is the repair path behind `flask refresh-stock-summaries`.
+def refresh_store_summaries(connection, store_ids):
+    store_ids = sorted({store_id for store_id in store_ids if store_id is not None})
+    if not store_ids:
+        return
+    _ensure_rows(connection, store_ids)
+    connection.execute(select(summaries.c.store_id).where(summaries.c.store_id.in_(store_ids))
+                       .order_by(summaries.c.store_id).with_for_update())
+
+    totals = {row.store_id: row for row in connection.execute(_totals(store_ids))}
+    now = datetime.utcnow()
+    params = []
+    for store_id in store_ids:
+        row = totals.get(store_id)
+        values = {name: (getattr(row, name) or 0) if row is not None else 0 for name in TOTAL_COLUMNS}
+        params.append(dict(values, b_store_id=store_id, refreshed_at=now))
+    connection.execute(update(summaries).where(summaries.c.store_id == bindparam('b_store_id')), params)
+
+
+def _price(value):
+    return Decimal(str(value)) if value is not None else Decimal(0)
+
+
+# Stock writers share-lock the product rows they value before locking or
+# writing any inventory row, and repricing takes the same rows exclusively
+# (its UPDATE) before add_price_changes locks the inventory it revalues. So a
+# product is never repriced while stock of it changes: one waits for the
+# other to commit and then values its change at the other's result. Taking
+# the product locks first in every writer keeps the order deadlock-free.
+def lock_prices(connection, product_ids, exclusive=False):
+    connection.execute(select(products.c.product_id).where(products.c.product_id.in_(product_ids))
+                       .order_by(products.c.product_id).with_for_update(read=not exclusive))
+
+
+def prices(connection, product_ids):
+    rows = connection.execute(select(products.c.product_id, products.c.buying_price, products.c.selling_price)
+                              .where(products.c.product_id.in_(product_ids)).with_for_update(read=True))
+    return {row.product_id: (_price(row.buying_price), _price(row.selling_price)) for row in rows}
+
+
+# Deltas are kept per store as {total column: signed change}
+def add_delta(deltas, store_id, sign=1, **changes):
+    totals = deltas.setdefault(store_id, dict.fromkeys(TOTAL_COLUMNS, 0))
+    for name, change in changes.items():
+        totals[name] += sign * change
+
+
+# Adds (sign=1) or removes (sign=-1) one inventory row's share of its store
+def add_row(deltas, row, product_prices, sign=1):
+    buying, selling = product_prices.get(row['product_id'], (0, 0))
+    in_stock = int(row['quantity_in_stock'])
+    add_delta(deltas, row['store_id'], sign, product_count=1, units_received=int(row['quantity_received']),
+              units_in_stock=in_stock, units_spoilt=int(row['quantity_spoilt']),
+              stock_value_at_cost=in_stock * buying, stock_value_at_retail=in_stock * selling)
+
+
+# Revalues the stock held of products whose prices changed by the given
+# (buying, selling) differences, at the current quantities
+def add_price_changes(connection, deltas, changes):
+    if not changes:
+        return
+    held = select(inventory.c.store_id, inventory.c.product_id, inventory.c.quantity_in_stock) \
+        .where(inventory.c.product_id.in_(changes)) \
+        .order_by(inventory.c.store_id, inventory.c.product_id).with_for_update()
+    for row in connection.execute(held):
+        buying, selling = changes[row.product_id]
+        add_delta(deltas, row.store_id, stock_value_at_cost=row.quantity_in_stock * buying,
+                  stock_value_at_retail=row.quantity_in_stock * selling)
+
+
+# Applies signed deltas to the summary rows with relative UPDATEs, in store
+# order, inside the caller's transaction. No totals are read, so concurrent
+# writers to one store only wait for each other's row lock, never for an
+# aggregate over the whole store.
+def apply_deltas(connection, deltas, store_ids=()):
+    store_ids = sorted({store_id for store_id in (*deltas, *store_ids) if store_id is not None})
+    if not store_ids:
+        return
+    _ensure_rows(connection, store_ids)
+    params = [dict({f'd_{name}': change for name, change in deltas[store_id].items()}, b_store_id=store_id)
+              for store_id in store_ids if any(deltas.get(store_id, {}).values())]
+    if params:
+        stmt = update(summaries).where(summaries.c.store_id == bindparam('b_store_id')).values(
+            refreshed_at=datetime.utcnow(),
+            **{name: summaries.c[name] + bindparam(f'd_{name}') for name in TOTAL_COLUMNS},
+        )
+        connection.execute(stmt, params)
+
+
+def _changed(instance, fields):
+    state = inspect(instance)
+    return any(state.attrs[name].history.has_changes() for name in fields)
+
+
+def _before_flush_value(instance, name):
+    history = inspect(instance).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(instance, name)
+
+
+# Before each ORM flush that writes inventory, lock the products it values
+# (see lock_prices); exclusively if the flush also reprices one of them, so
+# two such flushes do not both wait to upgrade a shared lock.
+def _lock_flushed_prices(session, flush_context, instances):
+    stocked, repriced = set(), False
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Inventory):
+            if instance in session.dirty and not _changed(instance, STOCK_FIELDS):
+                continue
+            stocked.add(instance.product_id)
+            if instance not in session.new:
+                stocked.add(_before_flush_value(instance, 'product_id'))
+        elif isinstance(instance, Product) and instance in session.dirty and _changed(instance, PRICE_FIELDS):
+            repriced = True
+    stocked.discard(None)
+    if stocked:
+        lock_prices(session.connection(), sorted(stocked), exclusive=repriced)
+
+
+# After each ORM flush, apply the change of every inventory row added,
+# removed or edited in it and revalue stock of products repriced in it.
+# Row changes are valued at the prices from before the flush and repricing
+# at the quantities after it, so the two add up to the new totals.
+def _refresh_flushed(session, flush_context):
+    removed, added, repriced, new_stores = [], [], {}, set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Inventory):
+            if instance in session.dirty and not _changed(instance, STOCK_FIELDS):
+                continue
+            if instance not in session.new:
+                removed.append({name: _before_flush_value(instance, name) for name in STOCK_FIELDS})
+            if instance not in session.deleted:
+                added.append({name: getattr(instance, name) for name in STOCK_FIELDS})
+        elif isinstance(instance, Product) and instance in session.dirty and _changed(instance, PRICE_FIELDS):
+            repriced[instance.product_id] = tuple(
+                (_price(_before_flush_value(instance, name)), _price(getattr(instance, name))) for name in PRICE_FIELDS)
+        elif isinstance(instance, Store) and instance in session.new:
+            new_stores.add(instance.store_id)
+    if not removed and not added and not repriced and not new_stores:
+        return
+
+    connection = session.connection()
+    deltas = {}
+    if removed or added:
+        product_prices = prices(connection, {row['product_id'] for row in (*removed, *added)})
+        product_prices.update({product_id: (buying[0], selling[0]) for product_id, (buying, selling) in repriced.items()})
+        for row in removed:
+            add_row(deltas, row, product_prices, -1)
+        for row in added:
+            add_row(deltas, row, product_prices)
+    add_price_changes(connection, deltas, {product_id: (buying[1] - buying[0], selling[1] - selling[0])
+                                           for product_id, (buying, selling) in repriced.items()})
+    apply_deltas(connection, deltas, new_stores)
+
+
+# Set-based writes that bypass the unit of work (see bulk.py) read the rows
+# they are about to overwrite with capture_rows, then pass them to
+# apply_for_rows once written. Rows are locked so they cannot change between.
+# A row another transaction inserts after the capture is not locked by it;
+# bulk.py inserts new keys with DO NOTHING and captures the ones that
+# conflict before overwriting them.
+CAPTURED_MODELS = (Inventory, Product)
+
+
+def captured_key(model, row):
+    return (row.get('store_id'), row.get('product_id')) if model is Inventory else row.get('sku')
+
+
+def lock_for_rows(model, rows):
+    if model is Inventory:
+        lock_prices(db.session.connection(), sorted({row['product_id'] for row in rows}))
+
+
+def capture_rows(model, rows):
+    connection = db.session.connection()
+    lock_for_rows(model, rows)
+    if model is Inventory:
+        keys = sorted({(row['store_id'], row['product_id']) for row in rows})
+        current = connection.execute(
+            select(*[inventory.c[name] for name in STOCK_FIELDS])
+            .where(tuple_(inventory.c.store_id, inventory.c.product_id).in_(keys))
+            .order_by(inventory.c.store_id, inventory.c.product_id).with_for_update())
+        return {(row.store_id, row.product_id): dict(row._mapping) for row in current}
+    if model is Product:
+        skus = sorted({row['sku'] for row in rows if row.get('sku') is not None})
+        if not skus:
+            return {}
+        current = connection.execute(
+            select(products.c.sku, products.c.product_id, products.c.buying_price, products.c.selling_price)
+            .where(products.c.sku.in_(skus)).order_by(products.c.sku).with_for_update())
+        return {row.sku: row for row in current}
+    return {}
+
+
+def apply_for_rows(model, rows, previous=None):
+    previous = previous or {}
+    connection = db.session.connection()
+    deltas = {}
+    if model is Inventory:
+        merged = []
+        for row in rows:
+            before = previous.get(captured_key(model, row))
+            merged.append((before, dict(before or {}, **{name: row[name] for name in STOCK_FIELDS if name in row})))
+        product_prices = prices(connection, {row['product_id'] for pair in merged for row in pair if row})
+        for before, after in merged:
+            if before is not None:
+                add_row(deltas, before, product_prices, -1)
+            add_row(deltas, after, product_prices)
+    elif model is Product:
+        changes = {}
+        for row in rows:
+            before = previous.get(captured_key(model, row))
+            if before is None or not any(name in row for name in PRICE_FIELDS):
+                continue
+            changes[before.product_id] = tuple(
+                _price(row[name]) - _price(getattr(before, name)) if name in row else 0 for name in PRICE_FIELDS)
+        add_price_changes(connection, deltas, changes)
+    apply_deltas(connection, deltas)
+
+
+def init_summaries():
+    if not event.contains(db.session, 'after_flush', _refresh_flushed):
+        event.listen(db.session, 'before_flush', _lock_flushed_prices)
+        event.listen(db.session, 'after_flush', _refresh_flushed)
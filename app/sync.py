@@ -0,0 +1,89 @@
+# app/sync.py
+import base64
+import json
+from sqlalchemy import select
+from . import db
+from .errors import QueryError
+from .models import Product, Store, Inventory, Tombstone
+from .pagination import apply_keyset, primary_key
+from .schemas import product_schema, store_schema, inventory_schema
+from .serializers import compile_serializer
+
+SYNC_MODELS = ((Product, product_schema), (Store, store_schema), (Inventory, inventory_schema))
+
+
+class SyncError(QueryError):
+    pass
+
+
+def encode_checkpoint(state):
+    payload = json.dumps(state, separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_checkpoint(token):
+    try:
+        state = json.loads(base64.urlsafe_b64decode((token + '=' * (-len(token) % 4)).encode()))
+    except (ValueError, TypeError):
+        raise SyncError('Invalid checkpoint')
+    if not isinstance(state, dict) or not all(_valid_cursors(cursors) for cursors in state.values()):
+        raise SyncError('Invalid checkpoint')
+    return state
+
+
+def _valid_cursors(cursors):
+    return isinstance(cursors, list) and len(cursors) == 2 and all(
+        cursor is None or (isinstance(cursor, list) and len(cursor) == 2 and all(isinstance(v, int) for v in cursor))
+        for cursor in cursors
+    )
+
+
+def _latest_tombstone(table):
+    row = db.session.execute(
+        select(Tombstone.version, Tombstone.tombstone_id)
+        .where(Tombstone.table_name == table)
+        .order_by(Tombstone.version.desc(), Tombstone.tombstone_id.desc())
+        .limit(1)
+    ).first()
+    return None if row is None else list(row)
+
+
+def _changed_rows(model, schema, after, limit):
+    serializer = compile_serializer(schema)
+    keys = [model.__table__.c.version, primary_key(model)]
+    stmt = apply_keyset(select(*serializer.columns), keys, False, after).limit(limit + 1)
+    rows = db.session.execute(stmt).all()
+    if rows:
+        after = [getattr(rows[:limit][-1], key.key) for key in keys]
+    return serializer.dump_rows(rows[:limit]), after, len(rows) > limit
+
+
+def _deleted_rows(table, after, limit):
+    keys = [Tombstone.__table__.c.version, Tombstone.__table__.c.tombstone_id]
+    stmt = select(Tombstone.row_id, Tombstone.version, Tombstone.tombstone_id).where(Tombstone.table_name == table)
+    rows = db.session.execute(apply_keyset(stmt, keys, False, after).limit(limit + 1)).all()
+    if rows:
+        after = [rows[:limit][-1].version, rows[:limit][-1].tombstone_id]
+    return [row.row_id for row in rows[:limit]], after, len(rows) > limit
+
+
+# Returns rows written and deleted since the checkpoint, at most `limit` of
+# each per table, ordered by the table change counter stamped on each row.
+def sync_changes(token, limit):
+    state = decode_checkpoint(token) if token else {}
+    changes = {}
+    next_state = {}
+    has_more = False
+    for model, schema in SYNC_MODELS:
+        table = model.__table__.name
+        if table in state:
+            rows_after, deleted_after = state[table]
+        else:
+            # A first sync starts from an empty catalog, so earlier deletes are irrelevant
+            rows_after, deleted_after = None, _latest_tombstone(table)
+        upserted, rows_after, more_rows = _changed_rows(model, schema, rows_after, limit)
+        deleted, deleted_after, more_deleted = _deleted_rows(table, deleted_after, limit)
+        changes[table] = {'upserted': upserted, 'deleted': deleted}
+        next_state[table] = [rows_after, deleted_after]
+        has_more = has_more or more_rows or more_deleted
+    return {'changes': changes, 'checkpoint': encode_checkpoint(next_state), 'has_more': has_more}
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+
+
+@pytest.fixture
+def app():
+    app, _ = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+# Counts SQL statements sent to the database, to catch N+1 regressions:
+#     with query_counter() as counter: ...; assert counter.count <= 2
+@pytest.fixture
+def query_counter(app):
+    @contextmanager
+    def counting():
+        counter = QueryCounter()
+        event.listen(db.engine, 'before_cursor_execute', counter)
+        try:
+            yield counter
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', counter)
+    return counting
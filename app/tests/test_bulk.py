@@ -0,0 +1,75 @@
+from app import db
+from app.models import Inventory, Product, Store
+
+
+def test_bulk_products_all_created(client):
+    items = [{'product_name': f'Product {i}', 'buying_price': '1.00', 'selling_price': '2.00'} for i in range(3)]
+
+    response = client.post('/products/bulk', json=items)
+    assert response.status_code == 201
+    assert response.json['created'] == 3
+    assert [r['product_id'] for r in response.json['results']] == [1, 2, 3]
+    assert Product.query.count() == 3
+    assert {p.version for p in Product.query.all()} == {1}
+
+
+def test_bulk_inventory_reports_partial_failures(client):
+    db.session.add(Store(store_name='Main', location='Nairobi'))
+    db.session.add(Product(product_name='Soap'))
+    db.session.commit()
+    row = {'product_id': 1, 'store_id': 1, 'quantity_received': 5, 'quantity_in_stock': 5,
+           'quantity_spoilt': 0, 'payment_status': 'paid'}
+
+    response = client.post('/inventories/bulk', json=[row, dict(row, store_id=99), dict(row, quantity_in_stock='many')])
+    assert response.status_code == 207
+    results = response.json['results']
+    assert results[0]['status'] == 'created'
+    assert results[1]['errors'] == {'store_id': ['Referenced row does not exist.']}
+    assert 'quantity_in_stock' in results[2]['errors']
+    assert Inventory.query.count() == 1
+
+
+def test_bulk_reports_constraint_violations_per_item(client):
+    items = [{'sku': 'SOAP-1', 'product_name': 'Soap'}, {'sku': 'SALT-1', 'product_name': 'Salt'},
+             {'sku': 'SOAP-1', 'product_name': 'Soap again'}]
+
+    response = client.post('/products/bulk', json=items)
+    assert response.status_code == 207
+    assert [r['status'] for r in response.json['results']] == ['created', 'created', 'error']
+    assert '_schema' in response.json['results'][2]['errors']
+    assert sorted(p.sku for p in Product.query.all()) == ['SALT-1', 'SOAP-1']
+
+
+def test_bulk_rejects_non_arrays(client):
+    assert client.post('/payments/bulk', json={'supplier_name': 'Acme'}).status_code == 400
+    assert client.post('/supply-requests/bulk', json=[{}]).status_code == 400
+
+
+def test_product_upsert_by_sku(client):
+    client.post('/products/bulk', json=[{'sku': 'SOAP-1', 'product_name': 'Soap', 'selling_price': '1.00'}])
+
+    response = client.post('/products/upsert', json=[
+        {'sku': 'SOAP-1', 'product_name': 'Soap bar', 'selling_price': '1.20'},
+        {'sku': 'SALT-1', 'product_name': 'Salt', 'selling_price': '0.50'},
+        {'product_name': 'No sku'},
+    ])
+    assert response.status_code == 207
+    assert response.json['upserted'] == 2
+    assert [r.get('product_id') for r in response.json['results'][:2]] == [1, 2]
+    assert response.json['results'][2]['errors'] == {'sku': ['Missing data for required field.']}
+    assert Product.query.filter_by(sku='SOAP-1').one().product_name == 'Soap bar'
+    assert Product.query.count() == 2
+
+
+def test_inventory_upsert_by_store_and_product(client):
+    db.session.add(Store(store_name='Main', location='Nairobi'))
+    db.session.add(Product(product_name='Soap'))
+    db.session.commit()
+    row = {'product_id': 1, 'store_id': 1, 'quantity_received': 5, 'quantity_in_stock': 5,
+           'quantity_spoilt': 0, 'payment_status': 'paid'}
+    client.post('/inventories/upsert', json=[row])
+
+    response = client.post('/inventories/upsert', json=[dict(row, quantity_in_stock=3), dict(row, quantity_in_stock=2)])
+    assert response.status_code == 200
+    assert response.json['results'][0]['status'] == 'superseded'
+    assert Inventory.query.one().quantity_in_stock == 2
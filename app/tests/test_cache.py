@@ -0,0 +1,100 @@
+from decimal import Decimal
+import fakeredis
+from app import db
+from app.cache import MemoryCache, RedisCache, get_cache
+from app.models import Product, Store
+
+
+def add_product(name='Soap'):
+    db.session.add(Product(product_name=name, buying_price=Decimal('1.00'), selling_price=Decimal('1.50')))
+    db.session.commit()
+
+
+def test_memory_cache_evicts_expires_and_invalidates():
+    now = [0.0]
+    cache = MemoryCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    cache.set('a', 1, tags=('products',))
+    cache.set('b', 2, tags=('stores',))
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None  # least recently used
+    assert cache.stats()['evictions'] == 1
+
+    cache.invalidate({'products'})
+    assert cache.get('a') is None
+
+    generation = cache.generation(('stores',))
+    cache.invalidate({'stores'})
+    assert not cache.set('d', 4, ('stores',), generation)
+
+    now[0] = 11
+    assert cache.get('c') is None
+
+
+def test_catalog_reads_hit_cache(client, query_counter):
+    add_product()
+    assert client.get('/products').status_code == 200
+
+    with query_counter() as counter:
+        response = client.get('/products')
+        assert client.get('/products', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert response.status_code == 200
+    assert len(response.json) == 1
+    assert counter.count == 0
+    assert get_cache().stats()['hits'] == 2
+
+
+def test_writes_invalidate_cache(client):
+    add_product()
+    assert client.get('/products/1').json['product_name'] == 'Soap'
+
+    client.put('/products/1', json={'product_name': 'Shampoo'})
+    assert client.get('/products/1').json['product_name'] == 'Shampoo'
+
+    client.delete('/products/1')
+    assert client.get('/products/1').status_code == 404
+    assert client.get('/products').json == []
+
+
+def test_store_routes(client):
+    db.session.add(Store(store_name='Main', location='Nairobi'))
+    db.session.commit()
+    assert [s['store_name'] for s in client.get('/stores').json] == ['Main']
+    assert client.get('/stores/1').json['location'] == 'Nairobi'
+    assert client.get('/stores/2').status_code == 404
+    assert client.get('/metrics/cache').json['misses'] == 3
+
+
+def test_redis_cache_invalidates_by_tag():
+    client = fakeredis.FakeRedis()
+    cache, other_worker = RedisCache(client, ttl=60), RedisCache(client, ttl=60)
+    cache.set('a', b'value', ('products',))
+    cache.set('b', b'other', ('stores',))
+    assert other_worker.get('a', ('products',)) == b'value'
+
+    generation = cache.generation(('products',))
+    other_worker.invalidate({'products'})
+    assert cache.get('a', ('products',)) is None
+    assert cache.get('b', ('stores',)) == b'other'
+    assert cache.invalidated_since(('products',), 5)
+
+    cache.set('a', b'computed before the write', ('products',), generation)
+    assert cache.get('a', ('products',)) is None
+
+
+def test_redis_cache_rounds_sub_second_ttl_up():
+    client = fakeredis.FakeRedis()
+    cache = RedisCache(client, ttl=0.5, prefix='')
+    cache.set('a', b'value')
+    cache.invalidate({'products'})
+    assert client.ttl('a') == 1
+    assert client.ttl('tag-at:products') == 1
+
+
+def test_user_reads_are_not_cached(client, query_counter):
+    # Users carry password hashes, which must not land in a shared cache
+    assert client.get('/users').json == []
+    with query_counter() as counter:
+        assert client.get('/users').json == []
+    assert counter.count > 0
+    assert get_cache().stats()['entries'] == 0
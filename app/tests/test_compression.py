@@ -0,0 +1,49 @@
+import gzip
+import json
+import zlib
+from decimal import Decimal
+from app import db
+from app.models import Product
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+def add_products(count):
+    db.session.add_all(Product(product_name=f'Product {i}', buying_price=Decimal('1.00'), selling_price=Decimal('1.50'))
+                       for i in range(count))
+    db.session.commit()
+
+
+def test_large_bodies_are_gzipped(client):
+    add_products(50)
+    response = client.get('/inventories?limit=1', headers=GZIP)
+    assert 'Content-Encoding' not in response.headers  # below COMPRESS_MIN_SIZE
+
+    response = client.get('/products', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(json.loads(gzip.decompress(response.get_data()))) == 50
+
+    plain = client.get('/products')
+    assert 'Content-Encoding' not in plain.headers
+    assert len(plain.json) == 50
+
+
+def test_cached_entries_are_stored_compressed(client):
+    add_products(50)
+    etag = client.get('/products', headers=GZIP).headers['ETag']
+    assert etag.startswith('W/')
+
+    data, = client.application.extensions['response_cache']._entries.values()
+    assert b'Content-Encoding' in data[2].partition(b'\n')[0]
+
+    assert client.get('/products', headers=dict(GZIP, **{'If-None-Match': etag})).status_code == 304
+    assert len(client.get('/products').json) == 50
+
+
+def test_ndjson_stream_is_gzipped_per_batch(client):
+    add_products(5)
+    response = client.get('/products?stream=1', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    lines = zlib.decompress(response.get_data(), 16 + zlib.MAX_WBITS).decode().splitlines()
+    assert [json.loads(line)['product_name'] for line in lines] == [f'Product {i}' for i in range(5)]
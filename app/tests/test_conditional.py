@@ -0,0 +1,37 @@
+from decimal import Decimal
+from app import db
+from app.models import Product
+
+
+def test_etag_round_trip_and_invalidation(client):
+    db.session.add(Product(product_name='Soap', buying_price=Decimal('1.00'), selling_price=Decimal('1.50')))
+    db.session.commit()
+
+    response = client.get('/products')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert 'Last-Modified' in response.headers
+
+    response = client.get('/products', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+
+    client.put('/products/1', json={'selling_price': '2.00'})
+    response = client.get('/products', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_etag_depends_on_query(client):
+    db.session.add(Product(product_name='Soap', buying_price=Decimal('1.00'), selling_price=Decimal('1.50')))
+    db.session.commit()
+
+    etag = client.get('/products/1').headers['ETag']
+    assert client.get('/products/1?fields=product_name', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/products/1', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_missing_rows_are_not_tagged(client):
+    response = client.get('/products/99')
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
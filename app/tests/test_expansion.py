@@ -0,0 +1,58 @@
+from app import db
+from app.models import Inventory, Product, Store, SupplyRequest, User
+
+
+def seed(count, clerk='clerk'):
+    store = Store(store_name='Main', location='Nairobi')
+    user = User(username=clerk, email=f'{clerk}@example.com', password_hash='secret', role='clerk')
+    db.session.add_all([store, user])
+    for i in range(count):
+        product = Product(product_name=f'Product {i}')
+        db.session.add(product)
+        db.session.flush()
+        inventory = Inventory(product_id=product.product_id, store_id=store.store_id, quantity_received=1,
+                              quantity_in_stock=1, quantity_spoilt=0, payment_status='paid')
+        db.session.add(inventory)
+        db.session.flush()
+        db.session.add(SupplyRequest(inventory_id=inventory.inventory_id, user_id=user.user_id, status='pending'))
+    db.session.commit()
+
+
+def test_expand_renders_nested_objects(client):
+    seed(1)
+
+    item = client.get('/supply-requests?expand=inventory.product,user').json[0]
+    assert item['inventory']['product']['product_name'] == 'Product 0'
+    assert item['user']['username'] == 'clerk'
+    assert 'password_hash' not in item['user']
+
+    detail = client.get('/supply-requests/1?expand=inventory&fields=status,inventory').json
+    assert set(detail) == {'status', 'inventory'}
+    assert detail['inventory']['inventory_id'] == 1
+
+
+def test_expand_does_not_issue_per_row_queries(client, query_counter):
+    seed(2)
+    with query_counter() as few:
+        assert len(client.get('/inventories?expand=product,store').json) == 2
+    db.session.expunge_all()
+
+    seed(20, clerk='second')
+    with query_counter() as many:
+        assert len(client.get('/inventories?expand=product,store').json) == 22
+    assert many.count == few.count <= 2
+
+
+def test_expanded_table_changes_invalidate_etag(client):
+    seed(1)
+    etag = client.get('/inventories?expand=product').headers['ETag']
+
+    client.put('/products/1', json={'product_name': 'Renamed'})
+    response = client.get('/inventories?expand=product', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json[0]['product']['product_name'] == 'Renamed'
+
+
+def test_unknown_expansions_are_rejected(client):
+    assert client.get('/inventories?expand=supplier').status_code == 400
+    assert client.get('/products?expand=inventories').status_code == 400
@@ -0,0 +1,40 @@
+import csv
+import io
+import zipfile
+from datetime import datetime
+from app import db
+from app.models import Payment
+
+
+def add_payments():
+    for i, status in enumerate(['paid', 'pending', 'paid']):
+        db.session.add(Payment(user_id=i + 1, supplier_name='Acme & Sons', invoice_number=f'INV-{i}', amount=10.5,
+                               payment_date=datetime(2024, 7, i + 1), payment_status=status))
+    db.session.commit()
+
+
+def test_csv_export_with_filters(client):
+    add_payments()
+
+    response = client.get('/payments/export?payment_date__in=2024-07-01,2024-07-03&fields=invoice_number,amount')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'payments.csv' in response.headers['Content-Disposition']
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows == [['invoice_number', 'amount'], ['INV-0', '10.5'], ['INV-2', '10.5']]
+
+
+def test_xlsx_export(client):
+    add_payments()
+
+    response = client.get('/payments/export?format=xlsx')
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+    assert archive.testzip() is None
+    sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+    assert sheet.count('<row>') == 4
+    assert 'Acme &amp; Sons' in sheet
+
+
+def test_unknown_export_format(client):
+    assert client.get('/payments/export?format=pdf').status_code == 400
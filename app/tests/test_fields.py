@@ -0,0 +1,35 @@
+from decimal import Decimal
+from app import db
+from app.models import Product
+
+
+def add_products():
+    db.session.add(Product(product_name='Soap', buying_price=Decimal('1.00'), selling_price=Decimal('1.50')))
+    db.session.add(Product(product_name='Salt', buying_price=Decimal('0.50'), selling_price=Decimal('0.75')))
+    db.session.commit()
+
+
+def test_list_fields_projection(client):
+    add_products()
+
+    response = client.get('/products?fields=product_name,selling_price&limit=1')
+    assert response.status_code == 200
+    assert len(response.json) == 1
+    assert set(response.json[0]) == {'product_name', 'selling_price'}
+    assert response.json[0]['product_name'] == 'Soap'
+    assert 'X-Next-Cursor' in response.headers
+
+    response = client.get('/products?fields=selling_price,product_name,selling_price&limit=1')
+    assert list(response.json[0]) == ['selling_price', 'product_name']
+
+
+def test_detail_fields_projection(client):
+    add_products()
+
+    assert client.get('/products/2?fields=product_name').json == {'product_name': 'Salt'}
+    assert client.get('/products/3?fields=product_name').status_code == 404
+
+
+def test_unknown_fields_are_rejected(client):
+    assert client.get('/products?fields=product_name,password').status_code == 400
+    assert client.get('/products/1?fields=nope').status_code == 400
@@ -0,0 +1,38 @@
+from datetime import datetime
+from app import db
+from app.models import SupplyRequest
+
+
+def add_requests():
+    for i, status in enumerate(['pending', 'approved', 'pending', 'declined']):
+        db.session.add(SupplyRequest(inventory_id=i + 1, user_id=i % 2 + 1, status=status,
+                                     request_date=datetime(2024, 7, i + 1, 9, 30)))
+    db.session.commit()
+
+
+def ids(response):
+    return [row['request_id'] for row in response.json]
+
+
+def test_equality_and_in_filters(client):
+    add_requests()
+
+    assert ids(client.get('/supply-requests?status=pending')) == [1, 3]
+    assert ids(client.get('/supply-requests?status__in=approved,declined')) == [2, 4]
+    assert ids(client.get('/supply-requests?status=pending&user_id=2')) == []
+
+
+def test_range_and_prefix_filters(client):
+    add_requests()
+
+    assert ids(client.get('/supply-requests?request_date__range=2024-07-02,2024-07-03')) == [2, 3]
+    assert ids(client.get('/supply-requests?request_date__range=2024-07-02T00:00,2024-07-03T00:00')) == [2]
+    assert ids(client.get('/supply-requests?request_date__gte=2024-07-03')) == [3, 4]
+    assert client.get('/supply-requests?status__prefix=de').status_code == 400
+
+
+def test_filters_are_whitelisted(client):
+    assert client.get('/supply-requests?password=x').status_code == 400
+    assert client.get('/supply-requests?status__like=x').status_code == 400
+    assert client.get('/supply-requests?user_id=abc').status_code == 400
+    assert client.get('/supply-requests?user_id__prefix=1').status_code == 400
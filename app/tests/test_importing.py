@@ -0,0 +1,72 @@
+from app import db, importing
+from app.ledger import balances
+from app.models import Inventory, Product, StockMovement, Store
+
+HEADER = 'product_id,store_id,quantity_received,quantity_in_stock,quantity_spoilt,payment_status\n'
+
+
+def seed():
+    db.session.add(Store(store_name='Main', location='Nairobi'))
+    db.session.add(Product(product_name='Soap'))
+    db.session.commit()
+
+
+def test_csv_import_merges_valid_rows_and_reports_rejects(client):
+    seed()
+    db.session.add(Product(product_name='Salt'))
+    db.session.commit()
+    body = HEADER + '1,1,10,9,1,paid\n1,2,5,5,0,paid\n1,1,x,5,0,paid\n2,1,3,3,0,unpaid\n2,1,4,4,0,paid\n'
+
+    response = client.post('/inventories/import', data=body, content_type='text/csv')
+    assert response.status_code == 200
+    assert response.json['imported'] == 2
+    assert response.json['rejected'] == 3
+    assert [e['line'] for e in response.json['errors']] == [3, 4, 6]
+    assert Inventory.query.count() == 2
+
+    response = client.post('/inventories/import', data=HEADER + '1,1,1,1,0,paid\n', content_type='text/csv')
+    assert response.json['errors'] == [{'line': 2, 'error': 'Inventory for this store and product already exists'}]
+    assert {i.version for i in Inventory.query.all()} == {1}
+
+
+def test_tsv_import_and_missing_columns(client):
+    seed()
+    body = HEADER.replace(',', '\t') + '1\t1\t10\t9\t1\tpaid\n'
+
+    response = client.post('/inventories/import', data=body, content_type='text/tab-separated-values')
+    assert response.json['imported'] == 1
+    assert client.post('/inventories/import', data='product_id\n1\n', content_type='text/csv').status_code == 400
+
+
+def test_cli_import(app, tmp_path):
+    seed()
+    path = tmp_path / 'goods_received.csv'
+    path.write_text(HEADER + '1,1,10,10,0,paid\n')
+
+    result = app.test_cli_runner().invoke(args=['import-inventory', str(path)])
+    assert 'Imported 1 rows, rejected 0.' in result.output
+    assert Inventory.query.count() == 1
+
+
+def test_import_is_reconciled_against_the_ledger(client):
+    seed()
+    db.session.add(Store(store_name='Annex', location='Mombasa'))
+    # Left over from an earlier inventory row for store 2
+    db.session.add(StockMovement(store_id=2, product_id=1, kind='receipt', quantity=3))
+    db.session.commit()
+
+    response = client.post('/inventories/import', data=HEADER + '1,1,10,9,1,paid\n1,2,8,8,0,paid\n',
+                           content_type='text/csv')
+    assert response.json['imported'] == 2
+    adjustments = StockMovement.query.filter_by(kind='adjustment').order_by(StockMovement.store_id).all()
+    assert [(m.store_id, m.quantity, m.reference) for m in adjustments] == [(1, 9, 'reconcile'), (2, 5, 'reconcile')]
+    assert balances(db.session.connection(), [(1, 1), (2, 1)]) == {(1, 1): 9, (2, 1): 8}
+
+
+def test_report_keeps_the_earliest_errors(monkeypatch):
+    monkeypatch.setattr(importing, 'MAX_REPORTED_ERRORS', 2)
+    report = importing.ImportReport()
+    for line in (9, 5, 7, 3):
+        report.reject(line, f'bad line {line}')
+    assert report.rejected == 4
+    assert report.errors == [{'line': 3, 'error': 'bad line 3'}, {'line': 5, 'error': 'bad line 5'}]
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import UniqueConstraint, select
+from app import db
+from app.filters import FILTERABLE_FIELDS, PREFIX_FIELDS
+from app.models import Invitation, Inventory, Payment, Product, SupplyRequest
+
+# SQLite backs unique constraints with an automatically named index
+UNIQUE_STORE_PRODUCT = ('uq_inventory_store_id_product_id', 'sqlite_autoindex_inventory_1')
+
+REPRESENTATIVE_QUERIES = [
+    (select(Inventory).where(Inventory.product_id == 1), 'ix_inventory_product_id'),
+    (select(Inventory).where(Inventory.store_id == 1), UNIQUE_STORE_PRODUCT),
+    (select(Inventory).where(Inventory.store_id == 1, Inventory.product_id == 1), UNIQUE_STORE_PRODUCT),
+    (select(SupplyRequest).where(SupplyRequest.inventory_id == 1), 'ix_supply_requests_inventory_id'),
+    (select(SupplyRequest).where(SupplyRequest.user_id == 1), 'ix_supply_requests_user_id'),
+    (select(SupplyRequest).where(SupplyRequest.status == 'pending').order_by(SupplyRequest.request_date),
+     'ix_supply_requests_status_request_date'),
+    (select(Payment).where(Payment.payment_date >= '2024-01-01'), 'ix_payments_payment_date'),
+    (select(Payment).where(Payment.supplier_name == 'Acme'), 'ix_payments_supplier_name'),
+    (select(Invitation).where(Invitation.expiry_date < '2024-01-01'), 'ix_invitations_expiry_date'),
+    (select(SupplyRequest).where(SupplyRequest.request_date >= '2024-01-01'), 'ix_supply_requests_request_date'),
+    (select(Product).where(Product.product_name == 'Soap'), 'ix_products_product_name'),
+]
+
+
+def query_plan(stmt):
+    connection = db.session.connection()
+    compiled = stmt.compile(connection, compile_kwargs={'literal_binds': True})
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        return '\n'.join(row[0] for row in connection.exec_driver_sql(f'EXPLAIN {compiled}'))
+    return '\n'.join(row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}'))
+
+
+@pytest.mark.parametrize('stmt, index', REPRESENTATIVE_QUERIES)
+def test_planner_uses_index(app, stmt, index):
+    plan = query_plan(stmt)
+    assert any(name in plan for name in (index if isinstance(index, tuple) else (index,))), plan
+
+
+def leading_columns(table):
+    leading = {table.primary_key.columns.values()[0].name}
+    leading.update(list(constraint.columns)[0].name for constraint in table.constraints
+                   if isinstance(constraint, UniqueConstraint))
+    leading.update(list(index.columns)[0].name for index in table.indexes)
+    return leading
+
+
+def test_filterable_fields_lead_an_index():
+    for model, fields in FILTERABLE_FIELDS.items():
+        missing = set(fields) - leading_columns(model.__table__)
+        assert not missing, f'{model.__tablename__}: {sorted(missing)}'
+
+
+def test_prefix_fields_have_pattern_indexes():
+    for model, fields in PREFIX_FIELDS.items():
+        for name in fields:
+            assert any(list(index.columns)[0].name == name
+                       and index.dialect_options['postgresql']['ops'].get(name) == 'text_pattern_ops'
+                       for index in model.__table__.indexes), name
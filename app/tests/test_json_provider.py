@@ -0,0 +1,39 @@
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from sqlalchemy import select
+from app import create_app, db
+from app.json_provider import OrjsonProvider, StdlibJSONProvider
+from app.models import Product
+
+
+def test_orjson_is_used_when_installed(app):
+    pytest.importorskip('orjson')
+    assert isinstance(app.json, OrjsonProvider)
+
+
+def test_providers_agree(app):
+    pytest.importorskip('orjson')
+    db.session.add(Product(product_name='Soap', buying_price=Decimal('1.00'), selling_price=Decimal('1.50')))
+    db.session.commit()
+    row = db.session.execute(select(Product.product_id, Product.selling_price)).first()
+    value = {'price': Decimal('2.50'), 'at': datetime(2024, 7, 11, 12, 0, 30, 5), 'row': row, 'items': [1, None]}
+
+    orjson_provider = OrjsonProvider(app)
+    expected = StdlibJSONProvider(app).dumps(value)
+    assert orjson_provider.dumps(value) == expected
+    assert orjson_provider.loads(expected)['price'] == '2.50'
+    assert orjson_provider.loads(expected)['at'] == '2024-07-11T12:00:30.000005'
+    assert Decimal(orjson_provider.loads(expected)['row']['selling_price']) == Decimal('1.50')
+
+
+def test_stdlib_provider_is_selectable():
+    app, _ = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'JSON_PROVIDER': 'stdlib'})
+    assert type(app.json) is StdlibJSONProvider
+    with app.test_request_context():
+        assert app.json.response(price=Decimal('1.5')).get_data() == b'{"price":"1.5"}\n'
+
+
+def test_response_matches_jsonify_format(app):
+    with app.test_request_context():
+        assert app.json.response([1, {'a': Decimal('1.50')}]).get_data() == b'[1,{"a":"1.50"}]\n'
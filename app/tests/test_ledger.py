@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app import db
+from app.ledger import balances, take_snapshots
+from app.models import Inventory, Product, StockMovement, StockSnapshot, Store
+
+
+def seed():
+    db.session.add_all([Store(store_name='Main', location='Nairobi'), Store(store_name='Annex', location='Mombasa')])
+    db.session.add(Product(product_name='Soap', buying_price=Decimal('1'), selling_price=Decimal('2')))
+    db.session.flush()
+    db.session.add_all([Inventory(store_id=store_id, product_id=1, quantity_received=10, quantity_in_stock=10,
+                                  quantity_spoilt=0, payment_status='paid') for store_id in (1, 2)])
+    db.session.commit()
+
+
+def stock(store_id):
+    return db.session.get(Inventory, store_id, populate_existing=True)
+
+
+def test_movements_update_inventory(client):
+    seed()
+    for movement in ({'kind': 'receipt', 'quantity': 5}, {'kind': 'sale', 'quantity': 3},
+                     {'kind': 'spoilage', 'quantity': 2}, {'kind': 'transfer', 'quantity': 4, 'to_store_id': 2}):
+        response = client.post('/stock-movements', json=dict(movement, store_id=1, product_id=1))
+        assert response.status_code == 201
+
+    main, annex = stock(1), stock(2)
+    assert (main.quantity_received, main.quantity_in_stock, main.quantity_spoilt) == (15, 6, 2)
+    assert annex.quantity_in_stock == 14
+    assert balances(db.session.connection(), [(1, 1), (2, 1)]) == {(1, 1): 6, (2, 1): 14}
+
+    transfer = [m for m in client.get('/stock-movements').json if m['kind'] == 'transfer']
+    assert [m['quantity'] for m in transfer] == [-4, 4]
+    assert transfer[0]['reference'] == transfer[1]['reference']
+
+
+def test_movements_bump_table_versions_after_locking_inventory(client, query_counter):
+    seed()
+    with query_counter() as counter:
+        client.post('/stock-movements', json={'store_id': 1, 'product_id': 1, 'kind': 'sale', 'quantity': 1})
+    statements = [statement.lower() for statement in counter.statements]
+    bump = next(i for i, statement in enumerate(statements) if 'table_versions' in statement)
+    lock = next(i for i, statement in enumerate(statements) if statement.startswith('select') and 'from inventory' in statement)
+    assert lock < bump
+    assert stock(1).version > 0
+
+
+def test_invalid_movements_are_rejected(client):
+    seed()
+    response = client.post('/stock-movements', json={'store_id': 1, 'product_id': 1, 'kind': 'sale', 'quantity': 11})
+    assert response.status_code == 409
+    assert client.post('/stock-movements', json={'store_id': 1, 'product_id': 2, 'kind': 'sale',
+                                                  'quantity': 1}).status_code == 400
+    assert client.post('/stock-movements', json={'store_id': 1, 'product_id': 1, 'kind': 'theft',
+                                                  'quantity': 1}).status_code == 400
+    response = client.post('/stock-movements', json={'store_id': 1, 'product_id': 1, 'kind': 'transfer',
+                                                      'quantity': 1, 'to_store_id': 'abc'})
+    assert response.status_code == 400
+    assert response.json['error'] == 'to_store_id must be an integer'
+    assert stock(1).quantity_in_stock == 10
+
+
+def test_direct_writes_are_reconciled_as_adjustments(app):
+    seed()
+    stock(1).quantity_in_stock = 7
+    db.session.commit()
+    adjustments = StockMovement.query.filter_by(store_id=1).order_by(StockMovement.movement_id).all()
+    assert [(m.kind, m.quantity, m.reference) for m in adjustments] == [('adjustment', 10, 'reconcile'),
+                                                                         ('adjustment', -3, 'reconcile')]
+    assert balances(db.session.connection(), [(1, 1)]) == {(1, 1): 7}
+
+
+def test_point_in_time_stock_uses_snapshot_and_tail(client):
+    seed()
+    client.post('/stock-movements', json={'store_id': 1, 'product_id': 1, 'kind': 'sale', 'quantity': 4})
+    assert take_snapshots(min_movements=1) == 2
+    assert StockSnapshot.query.filter_by(store_id=1).one().quantity_in_stock == 6
+    before = datetime.utcnow()
+    client.post('/stock-movements', json={'store_id': 1, 'product_id': 1, 'kind': 'sale', 'quantity': 1})
+
+    assert client.get('/stores/1/stock').json == [{'product_id': 1, 'quantity_in_stock': 5}]
+    assert client.get(f'/stores/1/stock?at={before.isoformat()}').json == [{'product_id': 1, 'quantity_in_stock': 6}]
+    assert client.get('/stores/1/stock?at=yesterday').status_code == 400
+
+
+def test_history_before_opening_balance_is_unknown(app):
+    seed()
+    db.session.add(StockSnapshot(store_id=2, product_id=1, movement_id=0, quantity_in_stock=10,
+                                 as_of=datetime.utcnow() + timedelta(hours=1)))
+    db.session.commit()
+    assert balances(db.session.connection(), store_id=2, at=datetime.utcnow()) == {(2, 1): 10}
+    assert balances(db.session.connection(), store_id=2, at=datetime.utcnow() - timedelta(days=1)) == {(2, 1): None}
+
+
+def test_snapshots_count_movements_from_each_pairs_last_snapshot(client, query_counter):
+    seed()  # each pair starts with one reconcile adjustment
+    sell = {'store_id': 1, 'product_id': 1, 'kind': 'sale', 'quantity': 1}
+    with query_counter() as counter:
+        assert take_snapshots(min_movements=3) == 0
+    assert 'group by' not in counter.statements[0].lower()
+
+    for _ in range(2):
+        client.post('/stock-movements', json=sell)
+    assert take_snapshots(min_movements=3) == 1
+    assert StockSnapshot.query.filter_by(store_id=1).one().quantity_in_stock == 8
+
+    for _ in range(2):
+        client.post('/stock-movements', json=sell)
+    assert take_snapshots(min_movements=3) == 0
+    client.post('/stock-movements', json=sell)
+    assert take_snapshots(min_movements=3) == 1
+
+
+def test_malformed_movement_bodies_are_rejected(client):
+    seed()
+    sale = {'store_id': 1, 'product_id': 1, 'kind': 'sale', 'quantity': 1}
+    for body, error in (([], 'At least one movement is required'),
+                        ([1], 'Each movement must be a JSON object'),
+                        (dict(sale, user_id='x'), 'user_id must be an integer'),
+                        (dict(sale, user_id=99), 'User 99 does not exist')):
+        response = client.post('/stock-movements', json=body)
+        assert (response.status_code, response.json['error']) == (400, error)
+    assert stock(1).quantity_in_stock == 10
@@ -0,0 +1,68 @@
+from decimal import Decimal
+from app import db
+from app.models import Product, User
+from app.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+
+
+def add_products(count):
+    for i in range(count):
+        db.session.add(Product(product_name=f'Product {i}', buying_price=Decimal('1.50'), selling_price=Decimal('2.00')))
+    db.session.commit()
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor('-product_id', [42])) == ('-product_id', [42])
+
+
+def test_products_are_paginated_by_cursor(client):
+    add_products(5)
+
+    response = client.get('/products?limit=2')
+    assert response.status_code == 200
+    assert [p['product_id'] for p in response.json] == [1, 2]
+    assert 'rel="next"' in response.headers['Link']
+
+    seen = [p['product_id'] for p in response.json]
+    while 'X-Next-Cursor' in response.headers:
+        response = client.get(f"/products?limit=2&cursor={response.headers['X-Next-Cursor']}")
+        seen += [p['product_id'] for p in response.json]
+    assert seen == [1, 2, 3, 4, 5]
+
+
+def test_descending_sort(client):
+    add_products(3)
+
+    response = client.get('/products?sort=-product_id&limit=2')
+    assert [p['product_id'] for p in response.json] == [3, 2]
+    response = client.get(f"/products?sort=-product_id&limit=2&cursor={response.headers['X-Next-Cursor']}")
+    assert [p['product_id'] for p in response.json] == [1]
+    assert 'Link' not in response.headers
+
+
+def test_limit_is_capped(client):
+    add_products(MAX_PAGE_SIZE + 5)
+
+    response = client.get(f'/products?limit={MAX_PAGE_SIZE * 10}')
+    assert response.status_code == 200
+    assert len(response.json) == MAX_PAGE_SIZE
+    assert 'X-Next-Cursor' in response.headers
+
+
+def test_rejects_unindexed_sort_and_bad_cursor(client):
+    assert client.get('/products?sort=selling_price').status_code == 400
+    assert client.get('/products?cursor=not-a-cursor').status_code == 400
+    tampered = client.get(f"/products?cursor={encode_cursor('product_id', [{'dec': 'abc'}])}")
+    assert (tampered.status_code, tampered.json) == (400, {'error': 'Invalid cursor'})
+    cursor = encode_cursor('product_id', [1])
+    assert client.get(f'/products?sort=-product_id&cursor={cursor}').status_code == 400
+
+
+def test_sort_by_indexed_column(client):
+    for name in ['carol', 'alice', 'bob']:
+        db.session.add(User(username=name, email=f'{name}@example.com', password_hash='x', role='clerk'))
+    db.session.commit()
+
+    response = client.get('/users?sort=username&limit=2')
+    assert [u['username'] for u in response.json] == ['alice', 'bob']
+    response = client.get(f"/users?sort=username&limit=2&cursor={response.headers['X-Next-Cursor']}")
+    assert [u['username'] for u in response.json] == ['carol']
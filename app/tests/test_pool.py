@@ -0,0 +1,33 @@
+from sqlalchemy import create_engine, text
+from app import Config
+from app.pool import InstrumentedQueuePool, engine_options, pool_metrics
+
+
+def test_engine_options_from_config():
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    config.update(DB_POOL_SIZE=12, DB_MAX_OVERFLOW=3, DB_STATEMENT_TIMEOUT_MS=5000, DB_APPLICATION_NAME='api-worker')
+
+    options = engine_options(config)
+    assert options['poolclass'] is InstrumentedQueuePool
+    assert (options['pool_size'], options['max_overflow']) == (12, 3)
+    assert options['connect_args'] == {'application_name': 'api-worker', 'options': '-c statement_timeout=5000'}
+
+    assert engine_options(dict(config, SQLALCHEMY_DATABASE_URI='sqlite://')) == {}
+
+
+def test_instrumented_pool_records_checkouts(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/pool.db', poolclass=InstrumentedQueuePool, pool_size=2)
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+        assert pool_metrics(engine)['checked_out'] == 1
+
+    metrics = pool_metrics(engine)
+    assert metrics['checkouts'] == 1
+    assert metrics['checked_out'] == 0
+    assert metrics['size'] == 2
+
+
+def test_pool_metrics_route(client):
+    response = client.get('/metrics/pool')
+    assert response.status_code == 200
+    assert 'status' in response.json
@@ -0,0 +1,81 @@
+from decimal import Decimal
+import numpy as np
+import pytest
+from app import db
+from app.models import Inventory, Product, Store, SupplyRequest, User
+from app.reorder import ReorderError, ReorderPolicy, daily_demand, load_sales, reorder_quantities, suggest_reorders
+
+
+def test_reorder_quantities_are_vectorized():
+    policy = ReorderPolicy(lead_time_days=7, safety_days=3, review_days=14, history_days=30)
+    received, in_stock, spoilt = np.array([100, 100, 50, 10]), np.array([10, 60, 50, 0]), np.array([0, 10, 0, 10])
+    demand = daily_demand(received, in_stock, spoilt, policy)
+    # 3/day: reorder point 30, order up to 30 + 42; 1/day: point 10, stock 60 is plenty; no demand: never
+    assert reorder_quantities(in_stock, demand, policy).tolist() == [62, 0, 0, 0]
+
+
+def seed():
+    db.session.add(User(username='planner', email='planner@example.com', password_hash='x', role='admin'))
+    db.session.add(Store(store_name='Main', location='Nairobi'))
+    db.session.add_all(Product(product_name=f'P{i}', buying_price=Decimal('1'), selling_price=Decimal('2')) for i in range(3))
+    db.session.flush()
+    for product_id, in_stock in [(1, 10), (2, 80), (3, 5)]:
+        db.session.add(Inventory(store_id=1, product_id=product_id, quantity_received=100, quantity_in_stock=in_stock,
+                                 quantity_spoilt=0, payment_status='paid'))
+    db.session.commit()
+
+
+def test_suggest_reorders_writes_drafts_once(app):
+    seed()
+    report = suggest_reorders(1)
+    assert report.scanned == 3
+    drafts = SupplyRequest.query.order_by(SupplyRequest.inventory_id).all()
+    assert [(d.inventory_id, d.status, d.quantity) for d in drafts] == [(1, 'draft', 62), (3, 'draft', 72)]
+
+    assert suggest_reorders(1).suggestions == []  # open drafts are not duplicated
+
+
+def test_cli_dry_run(app):
+    seed()
+    result = app.test_cli_runner().invoke(args=['suggest-reorders', '--user-id', '1', '--dry-run'])
+    assert 'Would create 2 draft supply requests' in result.output
+    assert SupplyRequest.query.count() == 0
+
+
+def test_recorded_sales_drive_demand(client):
+    seed()
+    # 60 units sold over the 30-day window: 2/day, reorder point 20, order up to 48
+    client.post('/stock-movements', json={'store_id': 1, 'product_id': 2, 'kind': 'sale', 'quantity': 60})
+    suggestions = {s['inventory_id']: s['quantity'] for s in suggest_reorders(1, dry_run=True).suggestions}
+    assert suggestions[2] == 28
+
+
+def test_tracked_rows_without_sales_have_no_demand(client):
+    seed()
+    # Product 1 would reorder on received - in stock, but the ledger now
+    # tracks it and shows no sales in the window
+    client.post('/stock-movements', json={'store_id': 1, 'product_id': 1, 'kind': 'receipt', 'quantity': 5})
+    suggestions = {s['inventory_id']: s['quantity'] for s in suggest_reorders(1, dry_run=True).suggestions}
+    assert suggestions == {3: 72}
+
+
+def test_sales_of_rows_missing_from_ids_are_dropped(client):
+    seed()
+    for product_id, quantity in [(1, 3), (3, 4)]:
+        client.post('/stock-movements', json={'store_id': 1, 'product_id': product_id, 'kind': 'sale',
+                                              'quantity': quantity})
+    # Rows 1 and 3 were stocked after the ids were read
+    sales = load_sales(np.array([2], dtype=np.int64), ReorderPolicy())
+    assert np.isnan(sales).all()
+
+
+def test_sales_outside_the_window_are_not_read(client, query_counter):
+    seed()
+    with query_counter() as counter:
+        load_sales(np.array([1, 2, 3], dtype=np.int64), ReorderPolicy())
+    statement = counter.statements[0].lower()
+    assert 'stock_movements.occurred_at >=' in statement.split('group by')[0]
+    assert 'exists' in statement
+
+    with pytest.raises(ReorderError, match='history_days must be positive'):
+        ReorderPolicy(history_days=0)
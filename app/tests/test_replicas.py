@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.models import Product
+from app.replicas import choose_replica
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    app, _ = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/primary.db',
+        'DATABASE_REPLICA_URLS': [f'sqlite:///{tmp_path}/replica.db'],
+    })
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(app.extensions['replicas'][0])
+        # The replica has not caught up with this row yet.
+        db.session.add(Product(product_name='Primary only', buying_price=1, selling_price=2, sku='P-1'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_reads_go_to_replica(replica_app):
+    client = replica_app.test_client()
+    assert client.get('/products').json == []
+
+
+def test_strong_consistency_reads_primary(replica_app):
+    client = replica_app.test_client()
+    response = client.get('/products', headers={'X-Consistency': 'strong'})
+    assert [p['sku'] for p in response.json] == ['P-1']
+
+
+def test_read_after_write_pins_client_to_primary(replica_app):
+    client = replica_app.test_client()
+    response = client.post('/products', json={'product_name': 'New', 'buying_price': 2, 'selling_price': 3, 'sku': 'P-2'})
+    assert response.status_code == 201
+    assert 'read_primary_until' in response.headers['Set-Cookie']
+
+    assert {p['sku'] for p in client.get('/products').json} == {'P-1', 'P-2'}
+
+
+def test_unreachable_replica_is_skipped_and_not_rechecked(tmp_path):
+    app, _ = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/primary.db',
+        'DATABASE_REPLICA_URLS': ['postgresql://nobody@127.0.0.1:1/replica'],
+        'REPLICA_LAG_CHECK_SECONDS': 60,
+    })
+    engine = app.extensions['replicas'][0]
+    connects = []
+    event.listen(engine, 'do_connect', lambda dialect, conn_rec, cargs, cparams: connects.append(cparams))
+    with app.test_request_context('/products'):
+        assert choose_replica() is None
+        assert choose_replica() is None
+    assert len(connects) == 1
+    assert connects[0]['connect_timeout'] == 2
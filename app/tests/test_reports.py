@@ -0,0 +1,48 @@
+from decimal import Decimal
+from app import db
+from app.models import Inventory, Product, Store
+
+
+def seed():
+    db.session.add_all([Store(store_name='Main', location='Nairobi'), Store(store_name='Annex', location='Mombasa')])
+    db.session.add_all([Product(product_name='Soap', sku='S-1', buying_price=Decimal('2.00'), selling_price=Decimal('3.00')),
+                        Product(product_name='Salt', sku='S-2', buying_price=Decimal('1.00'), selling_price=Decimal('1.50'))])
+    db.session.flush()
+    for store_id, product_id, in_stock, spoilt in [(1, 1, 8, 1), (1, 2, 4, 0), (2, 1, 10, 2)]:
+        db.session.add(Inventory(store_id=store_id, product_id=product_id, quantity_received=in_stock + spoilt,
+                                 quantity_in_stock=in_stock, quantity_spoilt=spoilt, payment_status='paid'))
+    db.session.commit()
+
+
+def money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def test_valuation_by_store(client):
+    seed()
+    rows = client.get('/reports/valuation').json
+    assert [(r['store_name'], money(r['stock_value_at_cost']), money(r['stock_value_at_retail']), money(r['margin']),
+             money(r['spoilage_loss'])) for r in rows] == [
+        ('Main', Decimal('20.00'), Decimal('30.00'), Decimal('10.00'), Decimal('2.00')),
+        ('Annex', Decimal('20.00'), Decimal('30.00'), Decimal('10.00'), Decimal('4.00')),
+    ]
+    assert rows[0]['margin_pct'] == '33.33'
+
+
+def test_valuation_by_product_and_store_pages_and_sorts(client):
+    seed()
+    response = client.get('/reports/valuation?group_by=product,store&sort=-stock_value_at_cost&limit=2')
+    first = response.json
+    assert [(r['store_id'], r['product_id']) for r in first] == [(2, 1), (1, 1)]
+
+    rest = client.get(f"/reports/valuation?group_by=product,store&sort=-stock_value_at_cost&limit=2"
+                      f"&cursor={response.headers['X-Next-Cursor']}").json
+    assert [(r['store_id'], r['product_id'], r['sku']) for r in rest] == [(1, 2, 'S-2')]
+
+    by_product = client.get('/reports/valuation?group_by=product&store_id=1').json
+    assert [(r['sku'], r['units_in_stock']) for r in by_product] == [('S-1', 8), ('S-2', 4)]
+
+
+def test_valuation_rejects_unknown_grouping(client):
+    assert client.get('/reports/valuation?group_by=supplier').status_code == 400
+    assert client.get('/reports/valuation?sort=store_name').status_code == 400
@@ -0,0 +1,28 @@
+from datetime import datetime
+from decimal import Decimal
+from app import db
+from app.models import Invitation, Payment, Product
+from app.schemas import invitations_schema, payments_schema, products_schema
+from app.serializers import compile_serializer
+
+
+def test_compiled_serializer_matches_schema(app):
+    db.session.add(Product(product_name='Soap', buying_price=Decimal('1.25'), selling_price=None))
+    db.session.add(Payment(user_id=1, supplier_name='Acme', invoice_number='INV-1', amount=5.5,
+                           payment_date=datetime(2024, 7, 11, 12, 0), payment_status='paid'))
+    db.session.add(Invitation(token='t', email='a@example.com', expiry_date=None))
+    db.session.commit()
+
+    for model, schema in [(Product, products_schema), (Payment, payments_schema), (Invitation, invitations_schema)]:
+        items = model.query.all()
+        assert compile_serializer(schema).dump_objects(items) == schema.dump(items)
+
+
+def test_column_read_path_matches_orm_path(app, client):
+    db.session.add(Payment(user_id=1, supplier_name='Acme', invoice_number='INV-1', amount=5.5,
+                           payment_date=datetime(2024, 7, 11, 12, 0), payment_status='paid'))
+    db.session.commit()
+
+    fast = client.get('/payments').json
+    app.config['FAST_SERIALIZATION'] = False
+    assert client.get('/payments').json == fast
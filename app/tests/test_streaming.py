@@ -0,0 +1,18 @@
+import json
+from app import db
+from app.models import Payment
+
+
+def test_payments_stream_as_ndjson(client):
+    for i in range(3):
+        db.session.add(Payment(user_id=i + 1, supplier_name='Acme', invoice_number=f'INV-{i}', amount=10.0, payment_status='paid'))
+    db.session.commit()
+
+    response = client.get('/payments', headers={'Accept': 'application/x-ndjson'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['invoice_number'] for row in rows] == ['INV-0', 'INV-1', 'INV-2']
+
+    assert client.get('/payments?stream=1').mimetype == 'application/x-ndjson'
+    assert client.get('/payments').mimetype == 'application/json'
@@ -0,0 +1,148 @@
+import io
+from decimal import Decimal
+from app import bulk, db
+from app.importing import import_inventory
+from app.ledger import movement_entries, record_movements
+from app.models import Inventory, Product, Store, StoreStockSummary
+from app.summaries import capture_rows, refresh_store_summaries
+
+
+def seed():
+    db.session.add_all([Store(store_name='Main', location='Nairobi'), Store(store_name='Annex', location='Mombasa')])
+    db.session.add_all([Product(product_name='Soap', sku='S-1', buying_price=Decimal('2.00'), selling_price=Decimal('3.00')),
+                        Product(product_name='Salt', sku='S-2', buying_price=Decimal('1.00'), selling_price=Decimal('1.50'))])
+    db.session.flush()
+    db.session.add_all([Inventory(store_id=1, product_id=1, quantity_received=10, quantity_in_stock=8, quantity_spoilt=1,
+                                  payment_status='paid'),
+                        Inventory(store_id=1, product_id=2, quantity_received=5, quantity_in_stock=4, quantity_spoilt=0,
+                                  payment_status='paid')])
+    db.session.commit()
+
+
+def summary(store_id):
+    row = db.session.get(StoreStockSummary, store_id, populate_existing=True)
+    return (row.product_count, row.units_in_stock, row.units_spoilt,
+            Decimal(row.stock_value_at_cost), Decimal(row.stock_value_at_retail))
+
+
+def test_orm_writes_keep_summaries_current(app):
+    seed()
+    assert summary(1) == (2, 12, 1, Decimal('20'), Decimal('30'))
+    assert summary(2) == (0, 0, 0, 0, 0)
+
+    db.session.get(Inventory, 1).quantity_in_stock = 6
+    db.session.get(Product, 2).buying_price = Decimal('2.00')
+    db.session.commit()
+    assert summary(1) == (2, 10, 1, Decimal('20'), Decimal('24'))
+
+    db.session.get(Inventory, 2).store_id = 2
+    db.session.commit()
+    assert summary(1) == (1, 6, 1, Decimal('12'), Decimal('18'))
+    assert summary(2) == (1, 4, 0, Decimal('8'), Decimal('6'))
+
+    db.session.delete(db.session.get(Inventory, 2))
+    db.session.commit()
+    assert summary(2) == (0, 0, 0, 0, 0)
+
+
+def test_set_based_writes_keep_summaries_current(client):
+    seed()
+    response = client.post('/inventories/upsert', json=[
+        {'store_id': 2, 'product_id': 1, 'quantity_received': 3, 'quantity_in_stock': 3, 'quantity_spoilt': 0,
+         'payment_status': 'paid'}])
+    assert response.status_code == 200
+    assert summary(2) == (1, 3, 0, Decimal('6'), Decimal('9'))
+
+    client.post('/products/upsert', json=[{'sku': 'S-1', 'product_name': 'Soap', 'buying_price': '1.00',
+                                           'selling_price': '3.00'}])
+    assert summary(1)[3] == Decimal('12')
+    assert summary(2)[3] == Decimal('3')
+
+
+def test_summary_endpoint_reads_one_row_per_store(client, query_counter):
+    seed()
+    with query_counter() as counter:
+        response = client.get('/stores/stock-summary')
+    assert response.status_code == 200
+    assert [(s['store_id'], s['units_in_stock']) for s in response.json] == [(1, 12), (2, 0)]
+    assert counter.count <= 2  # table versions for the ETag, then the page
+
+
+def test_deltas_match_a_full_recompute(app, client, query_counter):
+    seed()
+    db.session.add(Store(store_name='Depot', location='Kisumu'))
+    db.session.commit()
+
+    # A repricing and a stock change of the same product in one flush
+    with query_counter() as counter:
+        db.session.get(Inventory, 1).quantity_in_stock = 5
+        db.session.get(Product, 1).selling_price = Decimal('4.00')
+        db.session.commit()
+    # No store is re-aggregated; only the ledger sums its own movements
+    assert not any('sum(inventory' in statement.lower() for statement in counter.statements)
+
+    client.post('/inventories/upsert', json=[
+        {'store_id': 1, 'product_id': 2, 'quantity_received': 9, 'quantity_in_stock': 7, 'quantity_spoilt': 2,
+         'payment_status': 'paid'},
+        {'store_id': 2, 'product_id': 2, 'quantity_received': 4, 'quantity_in_stock': 4, 'quantity_spoilt': 0,
+         'payment_status': 'paid'}])
+    client.post('/products/upsert', json=[{'sku': 'S-2', 'product_name': 'Salt', 'buying_price': '1.25'}])
+    import_inventory(io.StringIO('product_id,store_id,quantity_received,quantity_in_stock,quantity_spoilt,payment_status\n'
+                                 '1,2,6,6,0,paid\n1,3,2,2,0,paid\n'))
+    record_movements(movement_entries({'kind': 'sale', 'store_id': 2, 'product_id': 1, 'quantity': 2}))
+    db.session.commit()
+
+    maintained = [summary(store_id) for store_id in (1, 2, 3)]
+    refresh_store_summaries(db.session.connection(), [1, 2, 3])
+    db.session.commit()
+    assert [summary(store_id) for store_id in (1, 2, 3)] == maintained
+    assert maintained[1] == (2, 8, 0, Decimal('13'), Decimal('22'))
+
+
+def test_refresh_command_repairs_drift(app):
+    seed()
+    db.session.get(StoreStockSummary, 1).units_in_stock = 999
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['refresh-stock-summaries'])
+    assert 'Refreshed 2 store summaries' in result.output
+    assert summary(1) == (2, 12, 1, Decimal('20'), Decimal('30'))
+
+
+def test_stock_writers_lock_products_before_inventory(app, query_counter):
+    seed()
+    item = db.session.get(Inventory, 1)
+
+    def first(statements, prefix):
+        return next(i for i, statement in enumerate(statements) if statement.lower().startswith(prefix))
+
+    with query_counter() as counter:
+        item.quantity_in_stock = 6
+        db.session.flush()
+    assert first(counter.statements, 'select products.product_id \nfrom products') \
+        < first(counter.statements, 'update inventory')
+
+    with query_counter() as counter:
+        record_movements(movement_entries({'store_id': 1, 'product_id': 2, 'kind': 'sale', 'quantity': 1}))
+    assert first(counter.statements, 'select products.product_id \nfrom products') \
+        < first(counter.statements, 'select inventory.inventory_id')
+    db.session.commit()
+
+
+def test_upsert_of_a_row_inserted_after_the_capture_is_not_counted_twice(client, monkeypatch):
+    seed()
+    captures = []
+
+    # The first capture misses (1, 1), as it would if another transaction
+    # inserted that row after this one looked
+    def late_capture(model, rows):
+        captures.append(rows)
+        return {} if len(captures) == 1 else capture_rows(model, rows)
+    monkeypatch.setattr(bulk, 'capture_rows', late_capture)
+
+    response = client.post('/inventories/upsert', json=[
+        {'store_id': 1, 'product_id': 1, 'quantity_received': 12, 'quantity_in_stock': 11, 'quantity_spoilt': 1,
+         'payment_status': 'paid'}])
+    assert response.status_code == 200
+    assert len(captures) == 2
+    assert summary(1) == (2, 15, 1, Decimal('26'), Decimal('39'))
@@ -0,0 +1,51 @@
+from decimal import Decimal
+from app import db
+from app.models import Inventory, Product, Store
+
+
+def sync(client, checkpoint=None, limit=100):
+    query = f'/sync?limit={limit}' + (f'&checkpoint={checkpoint}' if checkpoint else '')
+    response = client.get(query)
+    assert response.status_code == 200
+    return response.json
+
+
+def test_initial_sync_pages_through_catalog(client):
+    for i in range(3):
+        db.session.add(Product(product_name=f'Product {i}', buying_price=Decimal('1.00'), selling_price=Decimal('2.00')))
+    db.session.commit()
+
+    first = sync(client, limit=2)
+    assert [p['product_id'] for p in first['changes']['products']['upserted']] == [1, 2]
+    assert first['has_more']
+    second = sync(client, first['checkpoint'], limit=2)
+    assert [p['product_id'] for p in second['changes']['products']['upserted']] == [3]
+    assert not second['has_more']
+
+    assert sync(client, second['checkpoint'])['changes']['products'] == {'upserted': [], 'deleted': []}
+
+
+def test_delta_contains_updates_and_tombstones(client):
+    store = Store(store_name='Main', location='Nairobi')
+    soap = Product(product_name='Soap', buying_price=Decimal('1.00'), selling_price=Decimal('1.50'))
+    salt = Product(product_name='Salt', buying_price=Decimal('0.50'), selling_price=Decimal('0.75'))
+    db.session.add_all([store, soap, salt])
+    db.session.commit()
+    db.session.add(Inventory(product_id=soap.product_id, store_id=store.store_id, quantity_received=10,
+                             quantity_in_stock=10, quantity_spoilt=0, payment_status='paid'))
+    db.session.commit()
+    checkpoint = sync(client)['checkpoint']
+
+    soap.selling_price = Decimal('1.75')
+    db.session.delete(salt)
+    db.session.commit()
+
+    delta = sync(client, checkpoint)
+    assert [p['product_id'] for p in delta['changes']['products']['upserted']] == [soap.product_id]
+    assert delta['changes']['products']['deleted'] == [2]
+    assert delta['changes']['stores'] == {'upserted': [], 'deleted': []}
+    assert delta['changes']['inventory'] == {'upserted': [], 'deleted': []}
+
+
+def test_invalid_checkpoint(client):
+    assert client.get('/sync?checkpoint=garbage').status_code == 400
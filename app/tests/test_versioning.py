@@ -0,0 +1,42 @@
+from decimal import Decimal
+from app import db
+from app.models import Product, Store, Tombstone
+from app.versioning import PENDING_VERSION, get_table_versions
+
+
+def test_writes_stamp_rows_with_table_counter(app):
+    soap = Product(product_name='Soap', buying_price=Decimal('1.00'), selling_price=Decimal('1.50'))
+    salt = Product(product_name='Salt', buying_price=Decimal('0.50'), selling_price=Decimal('0.75'))
+    db.session.add_all([soap, salt])
+    db.session.commit()
+    assert (soap.version, salt.version) == (1, 1)
+
+    first_stamp = salt.updated_at
+    salt.selling_price = Decimal('0.80')
+    db.session.commit()
+    assert (soap.version, salt.version) == (1, 2)
+    assert salt.updated_at >= first_stamp
+
+    db.session.add(Store(store_name='Main', location='Nairobi'))
+    db.session.commit()
+    versions = get_table_versions(['products', 'stores'])
+    assert versions['products'][0] == 2
+    assert versions['stores'][0] == 1
+
+
+
+def test_counters_are_bumped_at_commit(app, query_counter):
+    soap = Product(product_name='Soap', buying_price=Decimal('1.00'), selling_price=Decimal('1.50'))
+    db.session.add(soap)
+    with query_counter() as counter:
+        db.session.flush()
+    assert not any('table_versions' in statement for statement in counter.statements)
+    assert soap.version == PENDING_VERSION
+
+    db.session.commit()
+    assert soap.version == 1
+    assert get_table_versions(['products'])['products'][0] == 1
+
+    db.session.delete(soap)
+    db.session.commit()
+    assert db.session.query(Tombstone.version).scalar() == 2
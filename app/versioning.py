@@ -0,0 +1,124 @@
+# app/versioning.py
+from datetime import datetime
+from sqlalchemy import event, inspect, select, update
+from . import db
+from .models import TableVersion, Tombstone, VersionedMixin
+
+table_versions = TableVersion.__table__
+tombstones = Tombstone.__table__
+
+# Session.info key holding the tables bumped in the current transaction
+CHANGED_TABLES = 'changed_tables'
+
+# Callables run with the set of changed table names after each commit that
+# bumped at least one table; see cache.py
+commit_hooks = []
+
+
+# Version stamped on rows written by a transaction that has not committed
+# yet; _publish_versions replaces it with the table counter at commit.
+PENDING_VERSION = -1
+
+
+# Before each flush, stamp every versioned row about to be written with
+# PENDING_VERSION and note its table. Taking the counter here would hold the
+# table_versions row lock for the rest of the transaction, so every writer of
+# a table would wait for the one before it to commit.
+def _stamp_changes(session, flush_context, instances):
+    changed = {}
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, VersionedMixin) and (instance in session.new or instance in session.deleted
+                                                      or session.is_modified(instance)):
+            changed.setdefault(instance.__table__.name, []).append(instance)
+    if not changed:
+        return
+
+    now = datetime.utcnow()
+    for name in sorted(changed):
+        mark_changed(name)
+        for instance in changed[name]:
+            if instance in session.deleted:
+                session.add(Tombstone(table_name=name, row_id=inspect(instance).identity[0], version=PENDING_VERSION,
+                                      deleted_at=now))
+            else:
+                instance.version = PENDING_VERSION
+                instance.updated_at = now
+
+
+def mark_changed(name):
+    db.session.info.setdefault(CHANGED_TABLES, set()).add(name)
+
+
+# At commit, bump the counter of every changed table and restamp this
+# transaction's pending rows and tombstones with it. Other transactions'
+# pending rows are invisible to the UPDATE, so it never waits on them. The
+# counter's row lock is held only from here to the end of the commit, so
+# writers to the same table still commit in counter order and a reader never
+# sees version N+1 before version N.
+def _publish_versions(session):
+    session.flush()
+    tables = session.info.get(CHANGED_TABLES)
+    if not tables:
+        return
+    now = datetime.utcnow()
+    connection = session.connection()
+    for name in sorted(tables):
+        version = bump_table(connection, name, now)
+        table = db.metadata.tables[name]
+        if 'version' in table.c:
+            connection.execute(update(table).where(table.c.version == PENDING_VERSION).values(version=version))
+            connection.execute(update(tombstones)
+                               .where(tombstones.c.table_name == name, tombstones.c.version == PENDING_VERSION)
+                               .values(version=version))
+
+
+def bump_table(connection, name, now=None):
+    now = now or datetime.utcnow()
+    version = connection.execute(
+        update(table_versions)
+        .where(table_versions.c.table_name == name)
+        .values(version=table_versions.c.version + 1, updated_at=now)
+        .returning(table_versions.c.version)
+    ).scalar()
+    if version is None:
+        version = 1
+        connection.execute(table_versions.insert().values(table_name=name, version=version, updated_at=now))
+    return version
+
+
+# For set-based inserts and updates that bypass the unit of work: note the
+# table and stamp every row dict as pending.
+def stamp_rows(model, rows):
+    now = datetime.utcnow()
+    mark_changed(model.__table__.name)
+    for row in rows:
+        row['version'] = PENDING_VERSION
+        row['updated_at'] = now
+    return rows
+
+
+def get_table_versions(tables):
+    rows = db.session.execute(
+        select(table_versions.c.table_name, table_versions.c.version, table_versions.c.updated_at)
+        .where(table_versions.c.table_name.in_(tables))
+    ).all()
+    return {row.table_name: (row.version, row.updated_at) for row in rows}
+
+
+def _run_commit_hooks(session):
+    tables = session.info.pop(CHANGED_TABLES, None)
+    if tables:
+        for hook in commit_hooks:
+            hook(tables)
+
+
+def _discard_changes(session):
+    session.info.pop(CHANGED_TABLES, None)
+
+
+def init_versioning():
+    if not event.contains(db.session, 'before_flush', _stamp_changes):
+        event.listen(db.session, 'before_flush', _stamp_changes)
+        event.listen(db.session, 'before_commit', _publish_versions)
+        event.listen(db.session, 'after_commit', _run_commit_hooks)
+        event.listen(db.session, 'after_rollback', _discard_changes)
@@ -0,0 +1,58 @@
+# benchmarks/bench_json.py
+# Compares the stdlib and orjson JSON providers on the list endpoints and on
+# raw encoding of the serialized rows.
+# Run from the repository root: python benchmarks/bench_json.py [rows]
+import os
+import sys
+import timeit
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Inventory, Payment, Product, Store
+from app.schemas import payments_schema, products_schema
+
+ENDPOINTS = ('/products', '/inventories', '/payments')
+
+
+def seed(rows):
+    db.session.add(Store(store_name='Main', location='Nairobi'))
+    db.session.add_all(Product(product_name=f'Product {i}', buying_price=Decimal('10.25'), selling_price=Decimal('12.50'))
+                       for i in range(rows))
+    db.session.flush()
+    db.session.add_all(Inventory(product_id=i + 1, store_id=1, quantity_received=10, quantity_in_stock=8,
+                                 quantity_spoilt=0, payment_status='paid') for i in range(rows))
+    db.session.add_all(Payment(user_id=i + 1, supplier_name='Acme', invoice_number=f'INV-{i}', amount=99.5,
+                               payment_date=datetime(2024, 7, 11, 12, 0), payment_status='paid')
+                       for i in range(rows))
+    db.session.commit()
+
+
+def report(label, func, number):
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f'  {label:<28} {best * 1000:8.2f} ms')
+
+
+def main(rows):
+    limit = min(rows, 1000)
+    for provider in ('stdlib', 'orjson'):
+        # Cache and compression off, so every request encodes the page again
+        app, _ = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'JSON_PROVIDER': provider,
+                             'CACHE_ENABLED': False, 'COMPRESS_ENABLED': False})
+        with app.app_context():
+            db.create_all()
+            seed(rows)
+            print(f'{provider} ({type(app.json).__name__}), {limit} rows per page')
+            client = app.test_client()
+            for endpoint in ENDPOINTS:
+                report(f'GET {endpoint}', lambda: client.get(f'{endpoint}?limit={limit}'), 5)
+            products = products_schema.dump(Product.query.limit(limit).all())
+            payments = payments_schema.dump(Payment.query.limit(limit).all())
+            report('dumps products', lambda: app.json.dumps(products), 20)
+            report('dumps payments', lambda: app.json.dumps(payments), 20)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
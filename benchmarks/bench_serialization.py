@@ -0,0 +1,51 @@
+# benchmarks/bench_serialization.py
+# Compares the serialization paths used by the list endpoints.
+# Run from the repository root: python benchmarks/bench_serialization.py [rows]
+import os
+import sys
+import timeit
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from app import create_app, db
+from app.models import Payment, Product
+from app.schemas import PaymentSchema, ProductSchema, payments_schema, products_schema
+from app.serializers import compile_serializer
+
+
+def seed(rows):
+    db.session.add_all(Product(product_name=f'Product {i}', buying_price=Decimal('10.25'), selling_price=Decimal('12.50'))
+                       for i in range(rows))
+    db.session.add_all(Payment(user_id=i + 1, supplier_name='Acme', invoice_number=f'INV-{i}', amount=99.5,
+                               payment_date=datetime(2024, 7, 11, 12, 0), payment_status='paid')
+                       for i in range(rows))
+    db.session.commit()
+
+
+def report(label, func, number):
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f'  {label:<28} {best * 1000:8.2f} ms')
+
+
+def main(rows):
+    app, _ = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    with app.app_context():
+        db.create_all()
+        seed(rows)
+        for model, schema_cls, many_schema in [(Product, ProductSchema, products_schema), (Payment, PaymentSchema, payments_schema)]:
+            items = model.query.all()
+            serializer = compile_serializer(many_schema)
+            print(f'{model.__name__} x {rows}')
+            report('schema per row', lambda: [schema_cls().dump(item) for item in items], 3)
+            report('shared many=True schema', lambda: many_schema.dump(items), 3)
+            report('compiled serializer', lambda: serializer.dump_objects(items), 3)
+            report('orm query + schema', lambda: many_schema.dump(db.session.execute(select(model)).scalars().all()), 3)
+            report('column query + compiled', lambda: serializer.dump_rows(db.session.execute(select(*serializer.columns)).all()), 3)
+            db.session.expunge_all()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
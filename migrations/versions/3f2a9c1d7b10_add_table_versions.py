@@ -0,0 +1,37 @@
+"""add table_versions change counters
+
+Revision ID: 3f2a9c1d7b10
+Revises: 
+Create Date: 2026-10-18 19:05:12.000000
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TRACKED_TABLES = ('users', 'invitations', 'products', 'inventory', 'supply_requests', 'payments', 'stores')
+
+
+def upgrade():
+    now = datetime.utcnow()
+    table_versions = op.create_table(
+        'table_versions',
+        sa.Column('table_name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('table_name')
+    )
+    op.bulk_insert(table_versions, [
+        {'table_name': name, 'version': 1, 'updated_at': now} for name in TRACKED_TABLES
+    ])
+
+
+def downgrade():
+    op.drop_table('table_versions')
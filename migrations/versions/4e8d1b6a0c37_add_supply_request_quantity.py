@@ -0,0 +1,26 @@
+"""add supply_requests.quantity
+
+Revision ID: 4e8d1b6a0c37
+Revises: 9a3c5e7b2f61
+Create Date: 2026-10-19 00:12:48.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8d1b6a0c37'
+down_revision = '9a3c5e7b2f61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('supply_requests') as batch_op:
+        batch_op.add_column(sa.Column('quantity', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('supply_requests') as batch_op:
+        batch_op.drop_column('quantity')
@@ -0,0 +1,48 @@
+"""add product sku and unique inventory (store_id, product_id)
+
+Revision ID: 5d0e8b3a91f4
+Revises: c7e19a4f2d68
+Create Date: 2026-10-18 21:03:48.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d0e8b3a91f4'
+down_revision = 'c7e19a4f2d68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('sku', sa.String(length=50), nullable=True))
+        batch_op.create_unique_constraint('products_sku_key', ['sku'])
+
+    # Fails if a store already has two inventory rows for one product; merge
+    # those rows before upgrading.
+    if op.get_bind().dialect.name == 'postgresql':
+        # Build the unique index without blocking inventory writes, then attach
+        # it as the constraint, which only needs a brief lock. An invalid index
+        # left by a failed earlier run is dropped first.
+        with op.get_context().autocommit_block():
+            op.drop_index('uq_inventory_store_id_product_id', table_name='inventory', postgresql_concurrently=True,
+                          if_exists=True)
+            op.create_index('uq_inventory_store_id_product_id', 'inventory', ['store_id', 'product_id'], unique=True,
+                            postgresql_concurrently=True)
+        op.execute('ALTER TABLE inventory ADD CONSTRAINT uq_inventory_store_id_product_id '
+                   'UNIQUE USING INDEX uq_inventory_store_id_product_id')
+    else:
+        with op.batch_alter_table('inventory') as batch_op:
+            batch_op.create_unique_constraint('uq_inventory_store_id_product_id', ['store_id', 'product_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('inventory') as batch_op:
+        batch_op.drop_constraint('uq_inventory_store_id_product_id', type_='unique')
+
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_constraint('products_sku_key', type_='unique')
+        batch_op.drop_column('sku')
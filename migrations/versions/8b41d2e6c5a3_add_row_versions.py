@@ -0,0 +1,110 @@
+"""add updated_at and version columns with change-stamping triggers
+
+Revision ID: 8b41d2e6c5a3
+Revises: 3f2a9c1d7b10
+Create Date: 2026-10-18 19:42:37.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41d2e6c5a3'
+down_revision = '3f2a9c1d7b10'
+branch_labels = None
+depends_on = None
+
+TRACKED_TABLES = ('users', 'invitations', 'products', 'inventory', 'supply_requests', 'payments', 'stores')
+
+# Writes that bypass the ORM (psql, COPY, other services) leave version at
+# its old value, or at 0 on insert. The trigger stamps those rows with the
+# next table counter value, so ETags and delta sync still see them.
+STAMP_FUNCTION = """
+CREATE OR REPLACE FUNCTION stamp_row_version() RETURNS trigger AS $$
+BEGIN
+    IF (TG_OP = 'INSERT' AND COALESCE(NEW.version, 0) = 0)
+       OR (TG_OP = 'UPDATE' AND NEW.version = OLD.version) THEN
+        UPDATE table_versions
+           SET version = version + 1, updated_at = timezone('utc', now())
+         WHERE table_name = TG_TABLE_NAME
+        RETURNING version INTO NEW.version;
+        NEW.updated_at := timezone('utc', now());
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+BUMP_ON_DELETE_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_versions
+       SET version = version + 1, updated_at = timezone('utc', now())
+     WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def index_state(bind, table, name):
+    """Return None if the index is missing, else 'valid' or 'invalid'."""
+    if bind.dialect.name == 'postgresql':
+        valid = bind.execute(sa.text('SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)'),
+                             {'name': name}).scalar()
+        return None if valid is None else ('valid' if valid else 'invalid')
+    return 'valid' if name in {index['name'] for index in sa.inspect(bind).get_indexes(table)} else None
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Existing rows get the current UTC time, like datetime.utcnow() in the
+    # application. SQLite's CURRENT_TIMESTAMP is already UTC.
+    utc_now = sa.text("timezone('utc', now())") if bind.dialect.name == 'postgresql' else sa.func.now()
+    for table in TRACKED_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=utc_now))
+            batch_op.add_column(sa.Column('version', sa.BigInteger(), nullable=False, server_default='1'))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', server_default=None)
+            batch_op.alter_column('version', server_default=None)
+
+    # Built concurrently outside the transaction so the tables stay writable;
+    # an INVALID index left by a failed earlier run is dropped and rebuilt.
+    with op.get_context().autocommit_block():
+        for table in TRACKED_TABLES:
+            for column in ('updated_at', 'version'):
+                name = f'ix_{table}_{column}'
+                state = index_state(bind, table, name)
+                if state == 'invalid':
+                    op.drop_index(name, table_name=table, postgresql_concurrently=True)
+                if state != 'valid':
+                    op.create_index(name, table, [column], unique=False, postgresql_concurrently=True)
+
+    if bind.dialect.name == 'postgresql':
+        op.execute(STAMP_FUNCTION)
+        op.execute(BUMP_ON_DELETE_FUNCTION)
+        for table in TRACKED_TABLES:
+            op.execute(f'CREATE TRIGGER {table}_stamp_row_version BEFORE INSERT OR UPDATE ON {table} '
+                       f'FOR EACH ROW EXECUTE FUNCTION stamp_row_version()')
+            op.execute(f'CREATE TRIGGER {table}_bump_on_delete AFTER DELETE ON {table} '
+                       f'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in TRACKED_TABLES:
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_bump_on_delete ON {table}')
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_stamp_row_version ON {table}')
+        op.execute('DROP FUNCTION IF EXISTS bump_table_version()')
+        op.execute('DROP FUNCTION IF EXISTS stamp_row_version()')
+
+    with op.get_context().autocommit_block():
+        for table in TRACKED_TABLES:
+            op.drop_index(f'ix_{table}_version', table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.drop_index(f'ix_{table}_updated_at', table_name=table, postgresql_concurrently=True, if_exists=True)
+    for table in TRACKED_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version')
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,59 @@
+"""add store_stock_summaries
+
+Revision ID: 9a3c5e7b2f61
+Revises: e2b6f7a04c19
+Create Date: 2026-10-18 23:05:12.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3c5e7b2f61'
+down_revision = 'e2b6f7a04c19'
+branch_labels = None
+depends_on = None
+
+BACKFILL = """
+INSERT INTO store_stock_summaries (store_id, product_count, units_received, units_in_stock, units_spoilt,
+                                   stock_value_at_cost, stock_value_at_retail, refreshed_at)
+SELECT s.store_id,
+       COUNT(i.inventory_id),
+       COALESCE(SUM(i.quantity_received), 0),
+       COALESCE(SUM(i.quantity_in_stock), 0),
+       COALESCE(SUM(i.quantity_spoilt), 0),
+       COALESCE(SUM(i.quantity_in_stock * COALESCE(p.buying_price, 0)), 0),
+       COALESCE(SUM(i.quantity_in_stock * COALESCE(p.selling_price, 0)), 0),
+       {utc_now}
+  FROM stores s
+  LEFT JOIN inventory i ON i.store_id = s.store_id
+  LEFT JOIN products p ON p.product_id = i.product_id
+ GROUP BY s.store_id
+"""
+
+
+# refreshed_at is naive UTC, as written by datetime.utcnow() in summaries.py
+def utc_now_sql():
+    return "timezone('utc', now())" if op.get_context().dialect.name == 'postgresql' else 'CURRENT_TIMESTAMP'
+
+
+def upgrade():
+    op.create_table(
+        'store_stock_summaries',
+        sa.Column('store_id', sa.Integer(), nullable=False),
+        sa.Column('product_count', sa.Integer(), nullable=False),
+        sa.Column('units_received', sa.BigInteger(), nullable=False),
+        sa.Column('units_in_stock', sa.BigInteger(), nullable=False),
+        sa.Column('units_spoilt', sa.BigInteger(), nullable=False),
+        sa.Column('stock_value_at_cost', sa.Numeric(), nullable=False),
+        sa.Column('stock_value_at_retail', sa.Numeric(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['store_id'], ['stores.store_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('store_id'),
+    )
+    op.execute(BACKFILL.format(utc_now=utc_now_sql()))
+
+
+def downgrade():
+    op.drop_table('store_stock_summaries')
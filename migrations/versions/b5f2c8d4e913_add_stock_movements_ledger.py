@@ -0,0 +1,71 @@
+"""add stock_movements ledger and stock_snapshots
+
+Revision ID: b5f2c8d4e913
+Revises: 4e8d1b6a0c37
+Create Date: 2026-10-19 01:26:03.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5f2c8d4e913'
+down_revision = '4e8d1b6a0c37'
+branch_labels = None
+depends_on = None
+
+# Current stock becomes the opening balance (movement_id 0) of every pair;
+# history before it is unknown.
+OPENING_SNAPSHOTS = """
+INSERT INTO stock_snapshots (store_id, product_id, movement_id, quantity_in_stock, as_of)
+SELECT store_id, product_id, 0, quantity_in_stock, {utc_now} FROM inventory
+"""
+
+
+# as_of is naive UTC like occurred_at; SQLite's CURRENT_TIMESTAMP already is
+def utc_now_sql():
+    return "timezone('utc', now())" if op.get_context().dialect.name == 'postgresql' else 'CURRENT_TIMESTAMP'
+
+
+def upgrade():
+    op.create_table(
+        'stock_movements',
+        sa.Column('movement_id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('store_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=12), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.Column('reference', sa.String(length=64), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['store_id'], ['stores.store_id']),
+        sa.ForeignKeyConstraint(['product_id'], ['products.product_id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id']),
+        sa.PrimaryKeyConstraint('movement_id'),
+    )
+    op.create_index('ix_stock_movements_occurred_at', 'stock_movements', ['occurred_at'])
+    op.create_index('ix_stock_movements_store_id_product_id_movement_id', 'stock_movements',
+                    ['store_id', 'product_id', 'movement_id'])
+
+    op.create_table(
+        'stock_snapshots',
+        sa.Column('store_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('movement_id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=False, nullable=False),
+        sa.Column('quantity_in_stock', sa.Integer(), nullable=False),
+        sa.Column('as_of', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['store_id'], ['stores.store_id']),
+        sa.ForeignKeyConstraint(['product_id'], ['products.product_id']),
+        sa.PrimaryKeyConstraint('store_id', 'product_id', 'movement_id'),
+    )
+    op.create_index('ix_stock_snapshots_store_id_product_id_as_of', 'stock_snapshots', ['store_id', 'product_id', 'as_of'])
+    op.execute(OPENING_SNAPSHOTS.format(utc_now=utc_now_sql()))
+
+
+def downgrade():
+    op.drop_index('ix_stock_snapshots_store_id_product_id_as_of', table_name='stock_snapshots')
+    op.drop_table('stock_snapshots')
+    op.drop_index('ix_stock_movements_store_id_product_id_movement_id', table_name='stock_movements')
+    op.drop_index('ix_stock_movements_occurred_at', table_name='stock_movements')
+    op.drop_table('stock_movements')
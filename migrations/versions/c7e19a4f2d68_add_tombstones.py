@@ -0,0 +1,84 @@
+"""add tombstones for deleted rows
+
+Revision ID: c7e19a4f2d68
+Revises: 8b41d2e6c5a3
+Create Date: 2026-10-18 20:21:05.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e19a4f2d68'
+down_revision = '8b41d2e6c5a3'
+branch_labels = None
+depends_on = None
+
+PRIMARY_KEYS = {
+    'users': 'user_id',
+    'invitations': 'user_id',
+    'products': 'product_id',
+    'inventory': 'inventory_id',
+    'supply_requests': 'request_id',
+    'payments': 'user_id',
+    'stores': 'store_id',
+}
+
+# Replaces the statement-level delete trigger: every deleted row bumps the
+# table counter and leaves a tombstone, unless the ORM already wrote one for
+# it in this transaction.
+TOMBSTONE_FUNCTION = """
+CREATE OR REPLACE FUNCTION record_tombstone() RETURNS trigger AS $$
+DECLARE
+    deleted_id integer := (to_jsonb(OLD) ->> TG_ARGV[0])::integer;
+    new_version bigint;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM tombstones
+         WHERE table_name = TG_TABLE_NAME AND row_id = deleted_id
+           AND version = (SELECT version FROM table_versions WHERE table_name = TG_TABLE_NAME)
+    ) THEN
+        UPDATE table_versions
+           SET version = version + 1, updated_at = timezone('utc', now())
+         WHERE table_name = TG_TABLE_NAME
+        RETURNING version INTO new_version;
+        INSERT INTO tombstones (table_name, row_id, version, deleted_at)
+        VALUES (TG_TABLE_NAME, deleted_id, new_version, timezone('utc', now()));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    op.create_table(
+        'tombstones',
+        sa.Column('tombstone_id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('table_name', sa.String(length=50), nullable=False),
+        sa.Column('row_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('tombstone_id')
+    )
+    op.create_index('ix_tombstones_table_name_version', 'tombstones', ['table_name', 'version', 'tombstone_id'], unique=False)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(TOMBSTONE_FUNCTION)
+        for table, pk in PRIMARY_KEYS.items():
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_bump_on_delete ON {table}')
+            op.execute(f"CREATE TRIGGER {table}_record_tombstone AFTER DELETE ON {table} "
+                       f"FOR EACH ROW EXECUTE FUNCTION record_tombstone('{pk}')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in PRIMARY_KEYS:
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_record_tombstone ON {table}')
+            op.execute(f'CREATE TRIGGER {table}_bump_on_delete AFTER DELETE ON {table} '
+                       f'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()')
+        op.execute('DROP FUNCTION IF EXISTS record_tombstone()')
+
+    op.drop_index('ix_tombstones_table_name_version', table_name='tombstones')
+    op.drop_table('tombstones')
@@ -0,0 +1,50 @@
+"""index product_name for prefix search and supply_requests.request_date
+
+Revision ID: d1a7c3e9b254
+Revises: b5f2c8d4e913
+Create Date: 2026-10-19 09:12:44.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1a7c3e9b254'
+down_revision = 'b5f2c8d4e913'
+branch_labels = None
+depends_on = None
+
+# Every filterable field must lead an index (see filters.FILTERABLE_FIELDS).
+# product_name uses text_pattern_ops so ?product_name__prefix= can use it.
+INDEXES = (
+    ('ix_products_product_name', 'products', ['product_name'], {'product_name': 'text_pattern_ops'}),
+    ('ix_supply_requests_request_date', 'supply_requests', ['request_date'], {}),
+)
+
+
+def index_state(bind, table, name):
+    """Return None if the index is missing, else 'valid' or 'invalid'."""
+    if bind.dialect.name == 'postgresql':
+        valid = bind.execute(sa.text('SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)'),
+                             {'name': name}).scalar()
+        return None if valid is None else ('valid' if valid else 'invalid')
+    return 'valid' if name in {index['name'] for index in sa.inspect(bind).get_indexes(table)} else None
+
+
+def upgrade():
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        for name, table, columns, ops in INDEXES:
+            state = index_state(bind, table, name)
+            if state == 'invalid':
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            if state != 'valid':
+                op.create_index(name, table, columns, unique=False, postgresql_concurrently=True,
+                                postgresql_ops=ops)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
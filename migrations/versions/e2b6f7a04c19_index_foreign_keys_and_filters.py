@@ -0,0 +1,59 @@
+"""index foreign keys and filter columns
+
+Revision ID: e2b6f7a04c19
+Revises: 5d0e8b3a91f4
+Create Date: 2026-10-18 21:37:20.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6f7a04c19'
+down_revision = '5d0e8b3a91f4'
+branch_labels = None
+depends_on = None
+
+# inventory.store_id is already covered by the leading column of
+# uq_inventory_store_id_product_id.
+INDEXES = (
+    ('ix_inventory_product_id', 'inventory', ['product_id']),
+    ('ix_supply_requests_inventory_id', 'supply_requests', ['inventory_id']),
+    ('ix_supply_requests_user_id', 'supply_requests', ['user_id']),
+    ('ix_supply_requests_status_request_date', 'supply_requests', ['status', 'request_date']),
+    ('ix_payments_payment_date', 'payments', ['payment_date']),
+    ('ix_payments_supplier_name', 'payments', ['supplier_name']),
+    ('ix_invitations_expiry_date', 'invitations', ['expiry_date']),
+)
+
+
+
+def index_state(bind, table, name):
+    """Return None if the index is missing, else 'valid' or 'invalid'."""
+    if bind.dialect.name == 'postgresql':
+        valid = bind.execute(sa.text('SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)'),
+                             {'name': name}).scalar()
+        return None if valid is None else ('valid' if valid else 'invalid')
+    return 'valid' if name in {index['name'] for index in sa.inspect(bind).get_indexes(table)} else None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, and it keeps
+    # the tables writable while the indexes build. A build that failed on an
+    # earlier run leaves an INVALID index behind that is never used for reads
+    # but still slows writes, so it is dropped and built again.
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            state = index_state(bind, table, name)
+            if state == 'invalid':
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            if state != 'valid':
+                op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,76 @@
+"""leave rows stamped with the pending version to the application
+
+Revision ID: f4c8a2d6b1e7
+Revises: d1a7c3e9b254
+Create Date: 2026-10-19 10:05:31.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c8a2d6b1e7'
+down_revision = 'd1a7c3e9b254'
+branch_labels = None
+depends_on = None
+
+# The application now stamps rows and tombstones with version -1 and
+# replaces it with the table counter at commit (see versioning.py), so the
+# triggers must not bump the counter for those writes: that would lock the
+# table_versions row for the rest of the transaction.
+STAMP_FUNCTION = """
+CREATE OR REPLACE FUNCTION stamp_row_version() RETURNS trigger AS $$
+BEGIN
+    IF (TG_OP = 'INSERT' AND COALESCE(NEW.version, 0) = 0)
+       OR (TG_OP = 'UPDATE' AND NEW.version = OLD.version AND NEW.version <> -1) THEN
+        UPDATE table_versions
+           SET version = version + 1, updated_at = timezone('utc', now())
+         WHERE table_name = TG_TABLE_NAME
+        RETURNING version INTO NEW.version;
+        NEW.updated_at := timezone('utc', now());
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TOMBSTONE_FUNCTION = """
+CREATE OR REPLACE FUNCTION record_tombstone() RETURNS trigger AS $$
+DECLARE
+    deleted_id integer := (to_jsonb(OLD) ->> TG_ARGV[0])::integer;
+    new_version bigint;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM tombstones
+         WHERE table_name = TG_TABLE_NAME AND row_id = deleted_id AND version = -1
+    ) THEN
+        UPDATE table_versions
+           SET version = version + 1, updated_at = timezone('utc', now())
+         WHERE table_name = TG_TABLE_NAME
+        RETURNING version INTO new_version;
+        INSERT INTO tombstones (table_name, row_id, version, deleted_at)
+        VALUES (TG_TABLE_NAME, deleted_id, new_version, timezone('utc', now()));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+PREVIOUS_STAMP_FUNCTION = STAMP_FUNCTION.replace(' AND NEW.version <> -1', '')
+
+PREVIOUS_TOMBSTONE_FUNCTION = TOMBSTONE_FUNCTION.replace(
+    'AND version = -1',
+    'AND version = (SELECT version FROM table_versions WHERE table_name = TG_TABLE_NAME)',
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(STAMP_FUNCTION)
+        op.execute(TOMBSTONE_FUNCTION)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(PREVIOUS_STAMP_FUNCTION)
+        op.execute(PREVIOUS_TOMBSTONE_FUNCTION)